@@ -2,11 +2,36 @@
 tests to run and debug your minimax and alphabeta agents locally.  The test
 cases used by the project assistant are not public.
 """
+import importlib.util
+import json
+import lookahead_scores
+import math
+import os
+import pickle
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
 import timeit
 import unittest
 
 import isolation
+import benchmark
+import eval_cache
 import game_agent
+import game_records
+import mcts
+import move_ordering
+import opening_book
+import parallel_search
+import ponder
+import search_stats
+import time_manager
+import tournament
+import tuning
+import transposition
 
 from importlib import reload
 
@@ -66,6 +91,756 @@ class IsolationTest(unittest.TestCase):
         time_left = lambda: 150 - (time_millis() - move_start)
         player1.get_move(game, time_left)
 
+    def test_imports_standalone(self):
+
+        # game_agent.py is submitted alone: the optional subsystems must only
+        # be imported when they are enabled
+        with tempfile.TemporaryDirectory() as directory:
+            shutil.copy(game_agent.__file__, directory)
+            subprocess.check_call([sys.executable, "-c", "import game_agent"],
+                                  cwd=directory)
+        self.assertEqual((transposition.EXACT, transposition.LOWER, transposition.UPPER),
+                         (game_agent.EXACT, game_agent.LOWER, game_agent.UPPER))
+
+
+class BitBoardTest(unittest.TestCase):
+    """The bitboard engine must follow the rules of the list-based Board"""
+
+    def test_matches_board(self):
+
+        rng = random.Random(0)
+        for _ in range(10):
+            player1, player2 = object(), object()
+            board = isolation.Board(player1, player2)
+            bitboard = isolation.BitBoard(player1, player2)
+
+            while True:
+                legal_moves = sorted(board.get_legal_moves())
+                self.assertEqual(legal_moves, sorted(bitboard.get_legal_moves()))
+                self.assertEqual(board.to_string(), bitboard.to_string())
+                for player in (player1, player2):
+                    self.assertEqual(board.utility(player), bitboard.utility(player))
+                    self.assertEqual(board.get_player_location(player),
+                                     bitboard.get_player_location(player))
+                    mobility = len(board.get_legal_moves(player))
+                    self.assertEqual(mobility, board.mobility(player))
+                    self.assertEqual(mobility, bitboard.mobility(player))
+                    self.assertEqual(lookahead_scores.lookahead_score(board, player),
+                                     lookahead_scores.lookahead_score(bitboard, player))
+                self.assertEqual(board.blocked_mask(), bitboard.blocked_mask())
+                if not legal_moves:
+                    break
+                move = rng.choice(legal_moves)
+                board.apply_move(move)
+                bitboard.apply_move(move)
+
+    def test_compact_boards_pickle(self):
+
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class("player1", "player2", 5, 5)
+            game.apply_move((2, 2))
+            game.push_move((0, 1))
+            self.assertFalse(hasattr(game, "__dict__"))
+
+            restored = pickle.loads(pickle.dumps(game))
+            self.assertEqual(game.to_string(), restored.to_string())
+            self.assertEqual(game.zobrist_key, restored.zobrist_key)
+            self.assertEqual((0, 1), restored.pop_move())
+
+
+class LookaheadTest(unittest.TestCase):
+    """Second-order mobility must count the open squares two knight moves away"""
+
+    def test_two_step_mobility(self):
+
+        rng = random.Random(8)
+        player1, player2 = "player1", "player2"
+        game = isolation.Board(player1, player2, 6, 5, shuffle=False)
+        for _ in range(8):
+            game.apply_move(rng.choice(game.get_legal_moves()))
+        r, c = game.get_player_location(player1)
+        directions = isolation.isolation.KNIGHT_DIRECTIONS
+        expected = {(r + dr1 + dr2, c + dc1 + dc2)
+                    for dr1, dc1 in directions for dr2, dc2 in directions
+                    if 0 <= r + dr1 < game.height and 0 <= c + dc1 < game.width}
+        expected = {move for move in expected
+                    if move != (r, c) and game.move_is_legal(move)}
+        self.assertEqual(len(expected),
+                         lookahead_scores.two_step_mobility(game, player1))
+
+
+class SymmetryTest(unittest.TestCase):
+    """Symmetric positions share a canonical key and map moves consistently"""
+
+    def test_canonical_key(self):
+
+        rng = random.Random(4)
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class(object(), object(), shuffle=False)
+            for _ in range(9):
+                game.apply_move(rng.choice(game.get_legal_moves()))
+            key, transform = game.canonical_key()
+            canonical, _ = game.canonicalize()
+            self.assertEqual(key, canonical.zobrist_key)
+            for r, c in canonical.get_blank_spaces():
+                open_neighbors = sum(canonical.move_is_legal((r + dr, c + dc))
+                                     for dr, dc in isolation.isolation.KNIGHT_DIRECTIONS)
+                self.assertEqual(open_neighbors, canonical.open_neighbor_count((r, c)))
+
+            for move in game.get_legal_moves():
+                image = game.transform_move(move, transform)
+                self.assertIn(image, canonical.get_legal_moves())
+                self.assertEqual(move, game.inverse_transform_move(image, transform))
+
+            for other in range(8):
+                image, _ = game.canonicalize()
+                image._permute(isolation.symmetry.transforms(7, 7)[other][0])
+                self.assertEqual(key, image.canonical_key()[0])
+
+
+class EvaluateStateTest(unittest.TestCase):
+    """evaluate_state() must agree with the move lists and terminal tests"""
+
+    def test_matches_move_generation(self):
+
+        rng = random.Random(6)
+        for board_class in (isolation.Board, isolation.BitBoard):
+            for _ in range(5):
+                player1, player2 = object(), object()
+                game = board_class(player1, player2)
+                while True:
+                    for player in (player1, player2):
+                        opponent = game.get_opponent(player)
+                        expected = (-math.inf if game.is_loser(player) else
+                                    math.inf if game.is_winner(player) else 0.,
+                                    len(game.get_legal_moves(player)),
+                                    len(game.get_legal_moves(opponent)))
+                        self.assertEqual(expected, game.evaluate_state(player))
+                    if not game.get_legal_moves():
+                        break
+                    game.apply_move(rng.choice(game.get_legal_moves()))
+
+
+class PushPopTest(unittest.TestCase):
+    """pop_move() must restore exactly the state before push_move()"""
+
+    def test_push_pop_restores_board(self):
+
+        rng = random.Random(1)
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class(object(), object())
+            game.apply_move((3, 3))
+            game.apply_move((0, 0))
+            before = (game.hash(), game.to_string(), game.move_count,
+                      game.active_player)
+
+            while game.get_legal_moves():
+                game.push_move(rng.choice(game.get_legal_moves()))
+            while game.move_count > 2:
+                game.pop_move()
+
+            self.assertEqual(before, (game.hash(), game.to_string(),
+                                      game.move_count, game.active_player))
+
+    def test_timeout_leaves_board_untouched(self):
+
+        player1 = game_agent.AlphaBetaPlayer()
+        player2 = game_agent.AlphaBetaPlayer()
+        game = isolation.Board(player1, player2)
+        game.apply_move((2, 1))
+        game.apply_move((2, 0))
+        before = game.to_string()
+
+        calls = iter(range(1000))
+        player1.get_move(game, lambda: 100. - next(calls, 1000))
+        self.assertEqual(before, game.to_string())
+        self.assertEqual(2, game.move_count)
+
+
+class ZobristTest(unittest.TestCase):
+    """Zobrist keys must depend on the position only, not on how it arose"""
+
+    def test_transpositions_share_key(self):
+
+        for board_class in (isolation.Board, isolation.BitBoard):
+            game = board_class(object(), object())
+            other = board_class(object(), object())
+            for move in [(3, 3), (0, 0), (1, 2), (2, 2), (0, 4)]:
+                game.apply_move(move)
+            for move in [(1, 2), (0, 0), (3, 3), (2, 2), (0, 4)]:
+                other.push_move(move)
+            self.assertEqual(game.zobrist_key, other.zobrist_key)
+
+            key = other.zobrist_key
+            other.push_move(other.get_legal_moves()[0])
+            self.assertNotEqual(key, other.zobrist_key)
+            other.pop_move()
+            self.assertEqual(key, other.zobrist_key)
+            self.assertEqual(key, other.copy().zobrist_key)
+
+    def test_engines_agree(self):
+
+        rng = random.Random(2)
+        board = isolation.Board(object(), object())
+        bitboard = isolation.BitBoard(object(), object())
+        while board.get_legal_moves():
+            move = rng.choice(board.get_legal_moves())
+            board.apply_move(move)
+            bitboard.apply_move(move)
+            self.assertEqual(board.zobrist_key, bitboard.zobrist_key)
+
+
+class TranspositionTableTest(unittest.TestCase):
+    """Transposition table policies and their use by AlphaBetaPlayer"""
+
+    def test_replacement_policies(self):
+
+        deep = transposition.TranspositionTable(4, transposition.DEPTH_PREFERRED)
+        deep.store(1, 5, transposition.EXACT, 1., (0, 0))
+        deep.store(5, 2, transposition.EXACT, 2., (1, 1))
+        self.assertEqual((0, 0), deep.best_move(1))
+        self.assertIsNone(deep.probe(5))
+        self.assertEqual(1, deep.collisions)
+
+        always = transposition.TranspositionTable(4, transposition.ALWAYS_REPLACE)
+        always.store(1, 5, transposition.EXACT, 1., (0, 0))
+        always.store(5, 2, transposition.EXACT, 2., (1, 1))
+        self.assertEqual((1, 1), always.best_move(5))
+        self.assertIsNone(always.best_move(1))
+
+        tiers = transposition.TranspositionTable(4, transposition.TWO_TIER)
+        tiers.store(1, 5, transposition.EXACT, 1., (0, 0))
+        tiers.store(3, 2, transposition.EXACT, 2., (1, 1))
+        tiers.store(5, 1, transposition.EXACT, 3., (2, 2))
+        self.assertEqual((0, 0), tiers.best_move(1))
+        self.assertEqual((2, 2), tiers.best_move(5))
+        self.assertIsNone(tiers.best_move(3))
+        self.assertEqual(2, tiers.stats()["used"])
+
+    def test_search_value_unchanged(self):
+
+        for policy in transposition.POLICIES:
+            plain = game_agent.AlphaBetaPlayer()
+            cached = game_agent.AlphaBetaPlayer(
+                transposition_table=transposition.TranspositionTable(2**10, policy))
+            for player in (plain, cached):
+                player.time_left = lambda: 1000.
+
+            game = isolation.Board(plain, cached)
+            game.apply_move((3, 3))
+            game.apply_move((2, 2))
+            inf = float("inf")
+            expected = plain.max_value(game, 4, -inf, inf)
+            game = isolation.Board(cached, plain)
+            game.apply_move((3, 3))
+            game.apply_move((2, 2))
+            for _ in range(2):
+                self.assertEqual(expected, cached.max_value(game, 4, -inf, inf))
+            self.assertGreater(cached.transposition_table.hits, 0)
+
+
+class MoveOrderingTest(unittest.TestCase):
+    """Hash move, then killers, then history order"""
+
+    def test_order(self):
+
+        game = isolation.Board(object(), object(), shuffle=False)
+        game.apply_move((3, 3))
+        game.apply_move((0, 0))
+        moves = game.get_legal_moves()
+        self.assertEqual(moves, game.get_legal_moves())
+
+        orderer = move_ordering.MoveOrderer()
+        orderer.record_cutoff(game, moves[5], 3)
+        orderer.history[moves[6]] = 100
+        ordered = orderer.order(game, moves, hash_move=moves[7])
+        self.assertEqual([moves[7], moves[5], moves[6]], ordered[:3])
+        self.assertEqual(sorted(moves), sorted(ordered))
+
+        orderer.new_search()
+        self.assertEqual({}, orderer.killers)
+        self.assertEqual(50, orderer.history[moves[6]])
+
+
+class PrincipalVariationSearchTest(unittest.TestCase):
+    """PVS and aspiration windows must find the same score as alpha-beta"""
+
+    def test_same_root_score(self):
+
+        players = [game_agent.AlphaBetaPlayer(),
+                   game_agent.AlphaBetaPlayer(pvs=True),
+                   game_agent.AlphaBetaPlayer(aspiration_window=1.),
+                   game_agent.AlphaBetaPlayer(
+                       pvs=True, aspiration_window=.5,
+                       transposition_table=transposition.TranspositionTable(),
+                       move_orderer=move_ordering.MoveOrderer()),
+                   game_agent.AlphaBetaPlayer(
+                       transposition_table=transposition.TranspositionTable(),
+                       move_orderer=move_ordering.MoveOrderer(),
+                       symmetry_plies=8)]
+
+        scores = []
+        for player in players:
+            player.time_left = lambda: 1000.
+            game = isolation.Board(player, object(), shuffle=False)
+            game.apply_move((3, 3))
+            game.apply_move((2, 4))
+            game.apply_move((1, 2))
+            game.apply_move((0, 2))
+            player_scores = []
+            for depth in range(1, 6):
+                player.aspiration_search(game, depth)
+                player_scores.append(player.best_score)
+            scores.append(player_scores)
+
+        for player_scores in scores[1:]:
+            self.assertEqual(scores[0], player_scores)
+
+    def test_random_positions(self):
+
+        rng = random.Random(7)
+        for _ in range(30):
+            history = []
+            game = isolation.Board("player1", "player2", shuffle=False)
+            for _ in range(rng.randint(2, 24)):
+                if not game.get_legal_moves():
+                    break
+                history.append(rng.choice(game.get_legal_moves()))
+                game.apply_move(history[-1])
+            if not game.get_legal_moves():
+                continue
+
+            scores = []
+            for player in (game_agent.AlphaBetaPlayer(),
+                           game_agent.AlphaBetaPlayer(pvs=True),
+                           game_agent.AlphaBetaPlayer(
+                               pvs=True, transposition_table=transposition.TranspositionTable(),
+                               move_orderer=move_ordering.MoveOrderer())):
+                player.time_left = lambda: 1000.
+                players = [player, "opponent"]
+                if len(history) % 2:
+                    players.reverse()
+                game = isolation.Board(players[0], players[1], shuffle=False)
+                for move in history:
+                    game.apply_move(move)
+                player_scores = []
+                for depth in range(1, 5):
+                    player.alphabeta(game, depth)
+                    player_scores.append(player.best_score)
+                scores.append(player_scores)
+
+            for player_scores in scores[1:]:
+                self.assertEqual(scores[0], player_scores)
+
+
+class EndgameTest(unittest.TestCase):
+    """The endgame solver must agree with an exhaustive search"""
+
+    def negamax(self, game):
+        best = -1
+        for move in game.get_legal_moves():
+            game.push_move(move)
+            best = max(best, -self.negamax(game))
+            game.pop_move()
+            if best == 1:
+                break
+        return best
+
+    def test_solve_matches_search(self):
+
+        from isolation import endgame
+
+        rng = random.Random(3)
+        solved = 0
+        for _ in range(50):
+            game = isolation.Board(object(), object(), 5, 5)
+            while game.get_legal_moves() and not (
+                    game.move_count >= 2 and endgame.is_partitioned(game)):
+                game.apply_move(rng.choice(game.get_legal_moves()))
+            result = endgame.solve(game)
+            if result is None:
+                continue
+            solved += 1
+            self.assertEqual(self.negamax(game) == 1, result[1])
+
+        self.assertGreater(solved, 0)
+
+    def test_time_budget(self):
+
+        from isolation import bitboard, endgame
+
+        masks = bitboard.knight_masks(7, 7)
+        clock = iter([1., 1., 0.])
+        with self.assertRaises(endgame.SolverLimit):
+            endgame.longest_path(0, (1 << 49) - 1, masks, max_nodes=10**9,
+                                 time_left=lambda: next(clock))
+
+
+class OpeningBookTest(unittest.TestCase):
+    """Book moves must map through the symmetry of the queried position"""
+
+    def test_lookup_through_symmetry(self):
+
+        entries = opening_book.build_book(plies=2, time_limit=20., width=5, height=5)
+        self.assertEqual(7, len(entries))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "book.bin")
+            opening_book.write_book(path, entries, 5, 5, 1)
+            book = opening_book.OpeningBook(path)
+
+            player1, player2 = object(), object()
+            reference = isolation.Board(player1, player2, 5, 5)
+            reference.apply_move((0, 1))
+            reference_move = book.lookup(reference)
+            self.assertIn(reference_move, reference.get_legal_moves())
+
+            for transform in range(8):
+                game = isolation.Board(player1, player2, 5, 5)
+                game.apply_move(reference.transform_move((0, 1), transform))
+                self.assertEqual(reference.transform_move(reference_move, transform),
+                                 book.lookup(game))
+
+            game.apply_move(game.get_legal_moves()[0])
+            game.apply_move(game.get_legal_moves()[0])
+            self.assertIsNone(book.lookup(game))
+
+            # a book is only consulted on boards of the size it was built for
+            game = isolation.Board(player1, player2, 7, 7)
+            opening_book.write_book(path, {game.canonical_key()[0]: 24}, 5, 5, 1)
+            self.assertIsNone(opening_book.OpeningBook(path).lookup(game))
+            opening_book.write_book(path, {game.canonical_key()[0]: 24}, 7, 7, 1)
+            self.assertEqual((3, 3), opening_book.OpeningBook(path).lookup(game))
+
+
+class EvalCacheTest(unittest.TestCase):
+    """Cached scores must match the heuristic and respect the size bound"""
+
+    def test_cache(self):
+
+        from sample_players import improved_score
+        cache = eval_cache.EvalCache(improved_score, size=3)
+        player1, player2 = "player1", "player2"
+        game = isolation.Board(player1, player2, shuffle=False)
+        game.apply_move((3, 3))
+        games = [game.forecast_move(move) for move in game.get_legal_moves()[:3]]
+        for child in games:
+            for player in (player1, player2):
+                self.assertEqual(improved_score(child, player), cache(child, player))
+        self.assertEqual(6, cache.misses)
+        self.assertEqual(3, len(cache))
+        self.assertEqual(3, cache.evictions)
+
+        cache(games[2], player2)
+        cache(games[0], player1)
+        self.assertEqual(1, cache.hits)
+        self.assertEqual(7, cache.misses)
+        self.assertAlmostEqual(1 / 8, cache.stats()["hit_rate"])
+
+
+class SearchStatsTest(unittest.TestCase):
+    """Instrumented players must record every move and export JSON lines"""
+
+    def test_records_moves(self):
+
+        for player in (game_agent.MinimaxPlayer(search_depth=2),
+                       game_agent.AlphaBetaPlayer()):
+            player.stats = search_stats.SearchStats("agent")
+            opponent = game_agent.MinimaxPlayer(search_depth=1)
+            game = isolation.Board(player, opponent, 5, 5)
+            calls = [0]
+
+            def time_left():
+                calls[0] += 1
+                return 1000. if calls[0] < 5000 else 0.
+
+            for _ in range(2):
+                calls[0] = 0
+                game.apply_move(player.get_move(game, time_left))
+                game.apply_move(opponent.get_move(game, lambda: 1000.))
+
+            records = player.stats.records
+            self.assertEqual(2, len(records))
+            self.assertEqual(player.nodes, records[-1]["nodes"])
+            self.assertGreater(records[-1]["score_calls"], 0)
+            self.assertGreater(records[-1]["movegen_calls"], 0)
+            self.assertIs(game_agent.custom_score, player.score)
+
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "stats.jsonl")
+                player.stats.write_json_lines(path, games=True)
+                with open(path) as f:
+                    summary = json.loads(f.readline())
+            self.assertEqual(2, summary["moves"])
+
+
+class BenchmarkTest(unittest.TestCase):
+    """The benchmark corpus must be reproducible and regressions detected"""
+
+    def test_corpus_and_compare(self):
+
+        self.assertEqual(benchmark.corpus_histories(6, seed=3),
+                         benchmark.corpus_histories(6, seed=3))
+        for game in benchmark.corpus(isolation.BitBoard, 6, seed=3):
+            self.assertTrue(game.get_legal_moves())
+
+        baseline = {"a": {"value": 100., "unit": "ops/sec"},
+                    "b": {"value": 100., "unit": "ops/sec"}}
+        results = {"a": {"value": 95., "unit": "ops/sec"},
+                   "b": {"value": 80., "unit": "ops/sec"}}
+        regressions = benchmark.compare(results, baseline, threshold=0.1)
+        self.assertEqual(["b"], [r[0] for r in regressions])
+
+
+class SeededReplayTest(unittest.TestCase):
+    """Games on seeded boards must replay to the same trajectory"""
+
+    def test_replay(self):
+
+        from sample_players import RandomPlayer
+        player1 = RandomPlayer()
+        player2 = game_agent.MinimaxPlayer(search_depth=1)
+        winner, history, _ = tournament.play_seeded(player1, player2, 7,
+                                                     [(3, 3), (2, 4)], 1000)
+        self.assertIs(winner, tournament.replay_game(player1, player2, 7, history,
+                                                     time_limit=1000)[0])
+
+        altered = history[:3] + [[-5, -5]] + history[4:]
+        with self.assertRaises(tournament.ReplayMismatch):
+            tournament.replay_game(player1, player2, 7, altered, time_limit=1000)
+
+
+class GameRecordTest(unittest.TestCase):
+    """Recorded tournament games must read back as they were played"""
+
+    def test_round_trip(self):
+
+        from sample_players import RandomPlayer
+        cpu_agent = tournament.Agent(RandomPlayer(), "Random")
+        test_agents = [tournament.Agent(game_agent.MinimaxPlayer(search_depth=1), "MM_1")]
+        wins = {cpu_agent.player: 0, test_agents[0].player: 0}
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.bin")
+            with game_records.GameRecordWriter(path) as writer:
+                tournament.play_round(cpu_agent, test_agents, wins, 2,
+                                      random.Random(5), writer.write)
+            with open(path, "ab") as f:
+                f.write(b"\x40\x00\x00\x00truncated")
+
+            with game_records.GameRecordReader(path) as reader:
+                self.assertEqual(4, len(reader))
+                records = list(reader)
+                results = list(reader.results())
+
+        self.assertEqual(wins[cpu_agent.player],
+                         sum(r.winner == [r.player_1, r.player_2].index("Random")
+                             for r in records))
+        for record, result in zip(records, results):
+            self.assertEqual(result, (record.player_1, record.player_2, record.winner,
+                                      record.termination, len(record.moves)))
+            self.assertEqual(len(record.moves), len(record.times))
+            self.assertEqual([0, 0], record.depths[:2])
+            players = [RandomPlayer(), game_agent.MinimaxPlayer(search_depth=1)]
+            if record.player_1 != "Random":
+                players.reverse()
+            replayed = tournament.replay_game(players[0], players[1], record.seed,
+                                              record.moves, time_limit=1000)
+            self.assertIs(players[record.winner], replayed[0])
+
+    def test_append_after_truncated_record(self):
+
+        records = [game_records.GameRecord("p1", "p2", seed, 7, 7, 2, seed % 2, "forfeit",
+                                           [(3, 3), (2, 4), (1, 2)], [0., 0., 5.],
+                                           [0, 0, 3])
+                   for seed in range(3)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "games.bin")
+            with game_records.GameRecordWriter(path) as writer:
+                writer.write(records[0])
+            with open(path, "ab") as f:
+                f.write(game_records.encode(records[1])[:-5])
+            for record in records[2:]:
+                with game_records.GameRecordWriter(path) as writer:
+                    writer.write(record)
+
+            with game_records.GameRecordReader(path) as reader:
+                self.assertEqual([records[0], records[2]], list(reader))
+
+
+class TimeManagerTest(unittest.TestCase):
+    """The time manager must poll the clock sparsely and stop iterative
+    deepening before a depth that cannot finish"""
+
+    def test_stops_before_timeout(self):
+
+        manager = time_manager.TimeManager(check_ms=1.)
+        player = game_agent.AlphaBetaPlayer(time_manager=manager)
+        game = isolation.Board(player, "opponent", 7, 7, shuffle=False)
+        game.apply_move((3, 3))
+        game.apply_move((2, 4))
+
+        # a clock that advances 0.01 ms per node searched
+        time_left = lambda: 100. - 0.01 * manager.nodes
+        player.get_move(game, time_left)
+
+        self.assertGreater(player.search_stats["depth"], 1)
+        self.assertFalse(player.search_stats["timed_out"])
+        self.assertLess(manager.checks, player.nodes / 10)
+        self.assertGreaterEqual(time_left(), player.TIMER_THRESHOLD - 1.)
+        self.assertEqual(player.nodes, manager.nodes)
+
+
+@unittest.skipIf(importlib.util.find_spec("numpy") is None, "requires NumPy")
+class BatchEvalTest(unittest.TestCase):
+    """Batch heuristics must match the scalar heuristics exactly"""
+
+    def test_children_match_scalar_scores(self):
+
+        import batch_eval
+        import sample_players
+        reload(game_agent)
+        score_fns = [getattr(sample_players, name, None) or getattr(game_agent, name)
+                     for name in batch_eval.BATCH_SCORES]
+        for history in benchmark.corpus_histories(12, seed=4):
+            game = benchmark.replay(history, board_class=isolation.BitBoard)
+            moves = game.get_legal_moves()
+            for player in (game.active_player, game.inactive_player):
+                for score_fn in score_fns:
+                    scores = batch_eval.batch_score(score_fn)(game, player, moves)
+                    self.assertEqual([score_fn(game.forecast_move(m), player) for m in moves],
+                                     list(scores))
+
+
+class MCTSTest(unittest.TestCase):
+    """The MCTS player must play legal moves and keep its subtree between
+    turns"""
+
+    def test_reuses_tree(self):
+
+        player = mcts.MCTSPlayer(rng=random.Random(0), max_nodes=500)
+        opponent = game_agent.MinimaxPlayer(search_depth=1)
+        game = isolation.Board(player, opponent, 5, 5)
+        game.apply_move((2, 2))
+        game.apply_move((0, 1))
+
+        reused = 0
+        while True:
+            calls = [0]
+
+            def time_left():
+                calls[0] += 1
+                return 1000. if calls[0] < 300 else 0.
+
+            move = player.get_move(game, time_left)
+            if move == (-1, -1):
+                break
+            self.assertIn(move, game.get_legal_moves())
+            self.assertLessEqual(player.pool.live, 500)
+            reused += player.search_stats["reused"]
+            game.apply_move(move)
+            reply = opponent.get_move(game, lambda: 1000.)
+            if reply == (-1, -1):
+                break
+            game.apply_move(reply)
+
+        self.assertGreater(reused, 0)
+
+
+class ParallelSearchTest(unittest.TestCase):
+    """The parallel player must return a searched move before the deadline"""
+
+    def test_returns_before_deadline(self):
+
+        player = parallel_search.ParallelAlphaBetaPlayer(workers=2)
+        game = isolation.Board(player, "opponent", 7, 7)
+        game.apply_move((3, 3))
+        game.apply_move((2, 4))
+        try:
+            start = timeit.default_timer()
+            time_left = lambda: 200. - 1000 * (timeit.default_timer() - start)
+            move = player.get_move(game, time_left)
+            self.assertGreater(time_left(), 0.)
+        finally:
+            player.close()
+        self.assertIn(move, game.get_legal_moves())
+        self.assertGreater(player.search_stats["depth"], 0)
+
+
+class PonderTest(unittest.TestCase):
+    """Pondering players must search the predicted position in the
+    background, merge the results and stop their processes"""
+
+    def setUp(self):
+        if ponder.fork_context() is None:
+            self.skipTest("requires the fork start method")
+
+    def test_merge_predicted_position(self):
+
+        player = game_agent.AlphaBetaPlayer(
+            transposition_table=transposition.TranspositionTable(2**12),
+            ponderer=ponder.Ponderer(max_time=5., min_cpus=1))
+        game = isolation.Board(player, "opponent", 5, 5, shuffle=False)
+        game.apply_move((2, 2))
+        player.start_pondering(game)
+        time.sleep(.2)
+        player.stop_pondering()
+        self.assertIsNone(player.ponderer._process)
+
+        game.apply_move(game.get_legal_moves()[0])
+        self.assertGreater(player.ponderer.merge(player, game), 0)
+        self.assertEqual(1, player.ponderer.hits)
+        self.assertGreater(player.transposition_table.stats()["used"], 0)
+
+    @unittest.skipIf(ponder.cpu_count() < 2, "requires a spare CPU core")
+    def test_ponder_game(self):
+
+        players = [game_agent.AlphaBetaPlayer(
+            transposition_table=transposition.TranspositionTable(2**12),
+            ponderer=ponder.Ponderer(max_time=5.)) for _ in range(2)]
+        game = isolation.Board(players[0], players[1], 5, 5, rng=random.Random(3))
+        winner, history, termination = game.play(time_limit=100, ponder=True)
+        self.assertNotEqual("timeout", termination)
+        self.assertIn(winner, players)
+        for player in players:
+            self.assertIsNone(player.ponderer._process)
+        self.assertGreater(sum(p.ponderer.hits + p.ponderer.misses for p in players), 0)
+
+    def test_needs_spare_core(self):
+
+        ponderer = ponder.Ponderer(min_cpus=ponder.cpu_count() + 1)
+        self.assertFalse(ponderer.enabled)
+        player = game_agent.AlphaBetaPlayer(
+            transposition_table=transposition.TranspositionTable(2**12), ponderer=ponderer)
+        game = isolation.Board(player, "opponent", 5, 5)
+        game.apply_move((2, 2))
+        player.start_pondering(game)
+        self.assertIsNone(ponderer._process)
+        self.assertEqual(0, ponderer.merge(player, game))
+
+
+class TuningTest(unittest.TestCase):
+    """Tuning runs must be reproducible and resumable from their checkpoint"""
+
+    def test_resume(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            checkpoint = os.path.join(directory, "checkpoint.json")
+            output = os.path.join(directory, "weights.json")
+            settings = {"pairs": 1, "depth": 1, "seed": 3, "eval_every": 2, "eval_pairs": 1}
+
+            tuner = tuning.SPSATuner(**settings)
+            tuning.tune(tuner, 2, checkpoint=checkpoint, log=None)
+            resumed = tuning.SPSATuner.load(checkpoint)
+            self.assertEqual(2, resumed.iteration)
+            tuning.tune(resumed, 3, output=output, log=None)
+
+            uninterrupted = tuning.SPSATuner(**settings)
+            tuning.tune(uninterrupted, 3, log=None)
+            self.assertEqual(uninterrupted.weights, resumed.weights)
+
+            weights = tuning.load_weights(output)
+            self.assertEqual(resumed.best["weights"], weights)
+            game_agent.WeightedScore(weights)
+
 
 if __name__ == '__main__':
     unittest.main()
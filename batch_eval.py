@@ -0,0 +1,233 @@
+"""Vectorized NumPy versions of the heuristics in sample_players.py and
+game_agent.py, scoring a whole batch of positions at once.
+
+The heuristics score one `Board` at a time. The children of a single node
+differ from their parent by one move; `children()` stacks them into a
+`Frontier` (and `stack()` does the same for any list of boards):
+
+    open         (k, n) bool array, True for the open squares of each child
+    own, opp     (k,) square indices of the evaluated player and of its
+                 opponent (-1 before a player is placed)
+    own_to_move  (k,) bool array, True when the evaluated player is to move
+    move_count   (k,) move counts
+
+(the children of one node share `own_to_move` and `move_count`, which are
+then plain scalars). The batch heuristics compute the mobility of both
+players in one pass, by indexing a precomputed knight adjacency matrix with
+the player squares and counting the open squares of each row. The results are identical to
+the scalar heuristics, including the infinite scores of terminal positions.
+
+The search agents do not use this module: since the boards track the
+mobility of the players incrementally (see `Board.evaluate_state`), scoring
+the children of a node one by one with push_move()/pop_move() is about
+twice as fast as building their `Frontier`, and alpha-beta would also lose
+the cutoffs among the children. It serves batch analyses of many
+positions, e.g., scoring a corpus of games. NumPy is only needed by this
+module.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from isolation.bitboard import knight_masks
+
+Frontier = namedtuple("Frontier", ["open", "own", "opp", "own_to_move",
+                                   "move_count", "width", "height"])
+
+_ADJACENCY_CACHE = {}
+_CENTER_CACHE = {}
+
+
+def adjacency(width, height):
+    """Return the (n, n) bool matrix whose row `idx` marks the squares a
+    knight can reach from the square index `idx`.
+    """
+    key = (width, height)
+    matrix = _ADJACENCY_CACHE.get(key)
+    if matrix is None:
+        size = width * height
+        matrix = np.zeros((size, size), dtype=bool)
+        for idx, mask in enumerate(knight_masks(width, height)):
+            for target in range(size):
+                matrix[idx, target] = (mask >> target) & 1
+        matrix = _ADJACENCY_CACHE[key] = matrix
+    return matrix
+
+
+def center_distances(width, height):
+    """Return the squared distance of every square index to the center of
+    the board, as computed by `sample_players.center_score`.
+    """
+    key = (width, height)
+    distances = _CENTER_CACHE.get(key)
+    if distances is None:
+        w, h = width / 2., height / 2.
+        distances = np.array([float((h - idx % height)**2 + (w - idx // height)**2)
+                              for idx in range(width * height)])
+        distances = _CENTER_CACHE[key] = distances
+    return distances
+
+
+def _player_slot(game, player):
+    """Return 0 if `player` is player 1 of `game`, 1 if it is player 2. """
+    active_slot = game.move_count % 2
+    if player == game.active_player:
+        return active_slot
+    game.get_opponent(player)  # raises for objects that are not players
+    return 1 - active_slot
+
+
+def _locations(game):
+    """Return the open square mask and the square indices of player 1 and
+    player 2 of `game` (-1 before a player is placed).
+    """
+    blocked, locations = game._occupancy()
+    open_squares = np.ones(game.width * game.height, dtype=bool)
+    open_squares[blocked] = False
+    return open_squares, [-1 if loc is None else loc for loc in locations]
+
+
+def children(game, player, moves):
+    """Return the `Frontier` of the positions reached by applying each of
+    `moves` to `game`, evaluated from the point of view of `player`.
+    """
+    h = game.height
+    k = len(moves)
+    parent, locations = _locations(game)
+    destinations = np.fromiter((r + c * h for r, c in moves), dtype=np.intp, count=k)
+
+    open_squares = np.repeat(parent[None, :], k, axis=0)
+    open_squares[np.arange(k), destinations] = False
+
+    active_slot = game.move_count % 2
+    squares = np.empty((k, 2), dtype=np.intp)
+    squares[:] = locations
+    squares[:, active_slot] = destinations
+
+    own_slot = _player_slot(game, player)
+    return Frontier(open_squares, squares[:, own_slot], squares[:, 1 - own_slot],
+                    own_slot != active_slot, game.move_count + 1,
+                    game.width, game.height)
+
+
+def stack(games, player):
+    """Return the `Frontier` of a list of games of the same size, evaluated
+    from the point of view of `player`.
+    """
+    open_squares, own, opp, own_to_move, move_count = [], [], [], [], []
+    for game in games:
+        squares, locations = _locations(game)
+        own_slot = _player_slot(game, player)
+        open_squares.append(squares)
+        own.append(locations[own_slot])
+        opp.append(locations[1 - own_slot])
+        own_to_move.append(own_slot == game.move_count % 2)
+        move_count.append(game.move_count)
+    game = games[0]
+    return Frontier(np.array(open_squares), np.array(own, dtype=np.intp),
+                    np.array(opp, dtype=np.intp), np.array(own_to_move),
+                    np.array(move_count), game.width, game.height)
+
+
+def mobility(frontier, squares):
+    """Return the number of legal moves of the players on `squares` in every
+    position of `frontier`.
+    """
+    rows = adjacency(frontier.width, frontier.height)[squares]
+    counts = (rows & frontier.open).sum(axis=1)
+    if squares.min() < 0:
+        counts = np.where(squares < 0, frontier.open.sum(axis=1), counts)
+    return counts
+
+
+def _with_terminals(frontier, own_moves, opp_moves, scores):
+    """Replace the scores of the positions where the player to move has no
+    legal moves by -inf (evaluated player to move) or +inf.
+    """
+    own_to_move = frontier.own_to_move
+    stuck = np.where(own_to_move, own_moves, opp_moves) == 0
+    if stuck.any():
+        scores = np.where(stuck, np.where(own_to_move, -np.inf, np.inf), scores)
+    return scores
+
+
+def null_score(frontier):
+    """Batch version of `sample_players.null_score`. """
+    own_moves, opp_moves = mobility(frontier, frontier.own), mobility(frontier, frontier.opp)
+    return _with_terminals(frontier, own_moves, opp_moves,
+                           np.zeros(len(frontier.own)))
+
+
+def open_move_score(frontier):
+    """Batch version of `sample_players.open_move_score`. """
+    own_moves, opp_moves = mobility(frontier, frontier.own), mobility(frontier, frontier.opp)
+    return _with_terminals(frontier, own_moves, opp_moves,
+                           own_moves.astype(np.float64))
+
+
+def improved_score(frontier):
+    """Batch version of `sample_players.improved_score`. """
+    own_moves, opp_moves = mobility(frontier, frontier.own), mobility(frontier, frontier.opp)
+    return _with_terminals(frontier, own_moves, opp_moves,
+                           (own_moves - opp_moves).astype(np.float64))
+
+
+def center_score(frontier):
+    """Batch version of `sample_players.center_score`; both players must be
+    placed.
+    """
+    own_moves, opp_moves = mobility(frontier, frontier.own), mobility(frontier, frontier.opp)
+    distances = center_distances(frontier.width, frontier.height)
+    return _with_terminals(frontier, own_moves, opp_moves, distances[frontier.own])
+
+
+def custom_score(frontier):
+    """Batch version of `game_agent.custom_score`. """
+    own_moves, opp_moves = mobility(frontier, frontier.own), mobility(frontier, frontier.opp)
+    return _with_terminals(frontier, own_moves, opp_moves,
+                           (own_moves - 2 * opp_moves).astype(np.float64))
+
+
+def custom_score_2(frontier):
+    """Batch version of `game_agent.custom_score_2`. """
+    own_moves, opp_moves = mobility(frontier, frontier.own), mobility(frontier, frontier.opp)
+    blocking = 2 * opp_moves - 0.5 * frontier.move_count
+    return _with_terminals(frontier, own_moves, opp_moves, own_moves - blocking)
+
+
+def custom_score_3(frontier):
+    """Batch version of `game_agent.custom_score_3`. """
+    own_moves, opp_moves = mobility(frontier, frontier.own), mobility(frontier, frontier.opp)
+    blocking = opp_moves + 0.5 * frontier.move_count
+    return _with_terminals(frontier, own_moves, opp_moves, own_moves - blocking)
+
+
+# The batch heuristics by the name of the heuristic they vectorize, so that
+# the table survives a reload of sample_players or game_agent
+BATCH_SCORES = {
+    "null_score": null_score,
+    "open_move_score": open_move_score,
+    "improved_score": improved_score,
+    "center_score": center_score,
+    "custom_score": custom_score,
+    "custom_score_2": custom_score_2,
+    "custom_score_3": custom_score_3,
+}
+
+
+def batch_score(score_fn):
+    """Return a function `(game, player, moves) -> numpy.ndarray` scoring the
+    children of `game` reached by `moves` like `score_fn` would score each
+    of them for `player`.
+
+    Raises ValueError if `score_fn` has no batch version.
+    """
+    try:
+        vectorized = BATCH_SCORES[score_fn.__name__]
+    except (AttributeError, KeyError):
+        raise ValueError("No batch version of the heuristic {}".format(
+            getattr(score_fn, "__name__", score_fn)))
+
+    def score_children(game, player, moves):
+        return vectorized(children(game, player, moves))
+    return score_children
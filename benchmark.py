@@ -0,0 +1,387 @@
+"""Measure the speed of the board primitives, the heuristics and the search
+agents on a fixed corpus of seeded positions.
+
+Every benchmark reports a throughput (ops/sec for the primitives and the
+heuristics, nodes/sec for the searches), so that engine changes can be
+judged on numbers:
+
+    python benchmark.py --save              # record a baseline
+    python benchmark.py                     # compare against it
+    python benchmark.py --parallel 8        # also measure the depth reached
+                                            # by the parallel search with
+                                            # 1, 2, 4 and 8 workers
+
+The comparison exits with a nonzero status when any benchmark is slower than
+its baseline by more than the threshold (10% by default). Baselines depend on
+the machine, so they are not part of the repository.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+import tracemalloc
+
+from isolation import Board, BitBoard
+from sample_players import (null_score, open_move_score, improved_score,
+                            center_score)
+from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score,
+                        custom_score_2, custom_score_3)
+from isolation.bitboard import knight_masks
+from lookahead_scores import (two_step_score, lookahead_score,
+                              blocking_lookahead_score)
+import mcts
+from parallel_search import ParallelAlphaBetaPlayer
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "benchmark_baseline.json")
+DEFAULT_THRESHOLD = 0.10
+DEFAULT_MIN_TIME = 0.2
+DEFAULT_SEED = 0
+PARALLEL_TIME_LIMIT = 150.
+CORPUS_SIZE = 24
+LOWER_IS_BETTER = {"bytes"}
+SEARCH_DEPTH = 4
+
+HEURISTICS = [
+    ("null_score", null_score),
+    ("open_move_score", open_move_score),
+    ("improved_score", improved_score),
+    ("center_score", center_score),
+    ("custom_score", custom_score),
+    ("custom_score_2", custom_score_2),
+    ("custom_score_3", custom_score_3),
+    ("two_step_score", two_step_score),
+    ("lookahead_score", lookahead_score),
+    ("blocking_lookahead_score", blocking_lookahead_score),
+]
+
+
+class BenchmarkPlayer(object):
+    """Stand-in player object for the positions of the corpus. """
+    pass
+
+
+def corpus_histories(size=CORPUS_SIZE, seed=DEFAULT_SEED, width=7, height=7):
+    """Return the move histories of `size` positions reached by seeded random
+    play, spread between the opening and the late middle game. The active
+    player has legal moves left in every position.
+    """
+    rng = random.Random(seed)
+    histories = []
+    while len(histories) < size:
+        game = Board(BenchmarkPlayer(), BenchmarkPlayer(), width, height,
+                     shuffle=False)
+        history = []
+        for _ in range(2 + len(histories) % 20):
+            moves = game.get_legal_moves()
+            if not moves:
+                break
+            history.append(rng.choice(moves))
+            game.apply_move(history[-1])
+        if game.get_legal_moves():
+            histories.append(history)
+    return histories
+
+
+def replay(history, player_1=None, player_2=None, board_class=Board, width=7,
+           height=7):
+    """Return a new board with the moves of `history` applied. """
+    game = board_class(player_1 or BenchmarkPlayer(), player_2 or BenchmarkPlayer(),
+                       width, height, shuffle=False)
+    for move in history:
+        game.apply_move(move)
+    return game
+
+
+def corpus(board_class=Board, size=CORPUS_SIZE, seed=DEFAULT_SEED):
+    """Return the positions of `corpus_histories()` as boards. """
+    return [replay(history, board_class=board_class)
+            for history in corpus_histories(size, seed)]
+
+
+def measure(run, setup=None, min_time=DEFAULT_MIN_TIME):
+    """Return the throughput of `run` in operations per second.
+
+    `run(data)` performs some work and returns how many operations (or
+    nodes) it performed, where `data` is the result of calling `setup()`
+    (untimed) before each repetition. Repetitions continue until at least
+    `min_time` seconds have been timed.
+    """
+    ops, elapsed = 0, 0.
+    while elapsed < min_time:
+        data = setup() if setup is not None else None
+        start = timeit.default_timer()
+        ops += run(data)
+        elapsed += timeit.default_timer() - start
+    return ops / elapsed
+
+
+def bench_primitives(positions, min_time=DEFAULT_MIN_TIME):
+    """Return the ops/sec of the board primitives over `positions`. """
+    first_moves = [game.get_legal_moves()[0] for game in positions]
+    pairs = list(zip(positions, first_moves))
+
+    def get_legal_moves(_):
+        for game in positions:
+            game.get_legal_moves()
+        return len(positions)
+
+    def apply_move(copies):
+        for game, move in zip(copies, first_moves):
+            game.apply_move(move)
+        return len(copies)
+
+    def forecast_move(_):
+        for game, move in pairs:
+            game.forecast_move(move)
+        return len(pairs)
+
+    def push_pop_move(_):
+        for game, move in pairs:
+            game.push_move(move)
+            game.pop_move()
+        return len(pairs)
+
+    def copy(_):
+        for game in positions:
+            game.copy()
+        return len(positions)
+
+    def utility(_):
+        for game in positions:
+            game.utility(game.active_player)
+        return len(positions)
+
+    return {
+        "get_legal_moves": measure(get_legal_moves, min_time=min_time),
+        "apply_move": measure(apply_move, lambda: [g.copy() for g in positions],
+                              min_time),
+        "forecast_move": measure(forecast_move, min_time=min_time),
+        "push_pop_move": measure(push_pop_move, min_time=min_time),
+        "copy": measure(copy, min_time=min_time),
+        "utility": measure(utility, min_time=min_time),
+    }
+
+
+def bench_memory(positions):
+    """Return the bytes allocated per board by `copy()` over `positions`,
+    i.e., the memory held by every node of a search that copies the board.
+    """
+    copies = []
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        for game in positions:
+            copies.append(game.copy())
+        allocated = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return {"copy": allocated / len(copies)}
+
+
+def bench_heuristics(positions, min_time=DEFAULT_MIN_TIME):
+    """Return the ops/sec of every heuristic over `positions`. """
+    results = {}
+    for name, score_fn in HEURISTICS:
+        def run(_, score_fn=score_fn):
+            for game in positions:
+                score_fn(game, game.active_player)
+            return len(positions)
+        results[name] = measure(run, min_time=min_time)
+    return results
+
+
+def search_nodes(player_class, histories, depth=SEARCH_DEPTH,
+                 score_fn=improved_score):
+    """Search every position of `histories` to a fixed depth and return
+    `(nodes, seconds)`.
+    """
+    nodes, elapsed = 0, 0.
+    for history in histories:
+        player = player_class(search_depth=depth, score_fn=score_fn)
+        player.time_left = lambda: float("inf")
+        if len(history) % 2:
+            game = replay(history, player_2=player)
+        else:
+            game = replay(history, player_1=player)
+        start = timeit.default_timer()
+        if player_class is MinimaxPlayer:
+            player.minimax(game, depth)
+        else:
+            player.alphabeta(game, depth)
+        elapsed += timeit.default_timer() - start
+        nodes += player.nodes
+    return nodes, elapsed
+
+
+def bench_search(histories, depth=SEARCH_DEPTH):
+    """Return the nodes/sec of the fixed-depth searches over the positions of
+    `histories`.
+    """
+    results = {}
+    for player_class in (MinimaxPlayer, AlphaBetaPlayer):
+        nodes, elapsed = search_nodes(player_class, histories, depth)
+        results["{}.depth_{}".format(player_class.__name__, depth)] = nodes / elapsed
+    return results
+
+
+def bench_playouts(positions, seed=DEFAULT_SEED, min_time=DEFAULT_MIN_TIME):
+    """Return the random playouts/sec of `mcts.playout` from `positions`. """
+    rand = random.Random(seed).random
+    states = []
+    for game in positions:
+        states.append(mcts.bitboard_state(game) + (knight_masks(game.width, game.height),
+                               (1 << (game.width * game.height)) - 1))
+
+    def run(_):
+        for blocked, loc, other, masks, full in states:
+            mcts.playout(blocked, loc, other, masks, full, rand)
+        return len(states)
+    return {"MCTSPlayer.playout": measure(run, min_time=min_time)}
+
+
+def bench_parallel(histories, max_workers, time_limit=PARALLEL_TIME_LIMIT):
+    """Return the mean depth completed by `ParallelAlphaBetaPlayer` within
+    `time_limit` milliseconds on the positions of `histories`, for 1, 2, 4,
+    ... up to `max_workers` workers, and the mean depth gained per added
+    core.
+    """
+    results = {}
+    counts = sorted({min(2**i, max_workers) for i in range(max_workers.bit_length() + 1)})
+    for workers in counts:
+        player = ParallelAlphaBetaPlayer(workers=workers)
+        depth = 0
+        try:
+            for history in histories:
+                if len(history) % 2:
+                    game = replay(history, player_2=player)
+                else:
+                    game = replay(history, player_1=player)
+                start = timeit.default_timer()
+                time_left = lambda: time_limit - 1000 * (timeit.default_timer() - start)
+                player.get_move(game, time_left)
+                depth += player.search_stats["depth"]
+        finally:
+            player.close()
+        results["workers_{}.depth".format(workers)] = depth / len(histories)
+
+    if len(counts) > 1:
+        gained = results["workers_{}.depth".format(counts[-1])] - results["workers_1.depth"]
+        results["depth_per_core"] = gained / (counts[-1] - 1)
+    return results
+
+
+def run_suite(seed=DEFAULT_SEED, size=CORPUS_SIZE, depth=SEARCH_DEPTH,
+              min_time=DEFAULT_MIN_TIME, parallel=0):
+    """Run every benchmark and return a dict mapping benchmark names to
+    `{"value": throughput, "unit": unit}`. The parallel search is measured
+    with up to `parallel` workers if it is more than 0.
+    """
+    results = {}
+
+    def add(prefix, values, unit):
+        for name, value in values.items():
+            results["{}.{}".format(prefix, name)] = {"value": value, "unit": unit}
+
+    histories = corpus_histories(size, seed)
+    for board_class in (Board, BitBoard):
+        positions = [replay(h, board_class=board_class) for h in histories]
+        add(board_class.__name__, bench_primitives(positions, min_time), "ops/sec")
+        add(board_class.__name__ + ".memory", bench_memory(positions), "bytes")
+    positions = [replay(h) for h in histories]
+    add("heuristic", bench_heuristics(positions, min_time), "ops/sec")
+    add("search", bench_search(histories, depth), "nodes/sec")
+    add("search", bench_playouts(positions, seed, min_time), "playouts/sec")
+    if parallel:
+        add("parallel", bench_parallel(histories, parallel), "plies")
+    return results
+
+
+def save_baseline(path, results):
+    """Write `results` to the baseline file at `path`. """
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=True)
+
+
+def load_baseline(path):
+    """Return the results stored in the baseline file at `path`. """
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Return `(name, value, baseline_value, change)` for every benchmark of
+    `results` that is slower than `baseline` by more than `threshold` (a
+    fraction of the baseline throughput), or that uses more memory by more
+    than `threshold`.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        value, reference = result["value"], baseline[name]["value"]
+        change = value / reference - 1 if reference else 0.
+        if result["unit"] in LOWER_IS_BETTER:
+            change = -change
+        if change < -threshold:
+            regressions.append((name, value, reference, change))
+    return regressions
+
+
+def report(results, baseline=None):
+    """Print one line per benchmark, with the change from `baseline`. """
+    for name, result in sorted(results.items()):
+        value = result["value"]
+        line = "{:<40} {:>14} {}".format(
+            name, "{:,.0f}".format(value) if value >= 100 else "{:.2f}".format(value),
+            result["unit"])
+        if baseline and name in baseline and baseline[name]["value"]:
+            line += "  ({:+.1%})".format(result["value"] / baseline[name]["value"] - 1)
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Isolation engine.")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help="baseline file to compare against or save to")
+    parser.add_argument("--save", action="store_true",
+                        help="save this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="largest tolerated slowdown, as a fraction")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--positions", type=int, default=CORPUS_SIZE)
+    parser.add_argument("--depth", type=int, default=SEARCH_DEPTH)
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME,
+                        help="seconds spent timing each benchmark")
+    parser.add_argument("--parallel", type=int, default=0, metavar="N",
+                        help="measure the depth reached by the parallel search "
+                             "with up to N workers")
+    args = parser.parse_args()
+
+    results = run_suite(args.seed, args.positions, args.depth, args.min_time,
+                        args.parallel)
+    baseline = None
+    if not args.save and os.path.exists(args.baseline):
+        baseline = load_baseline(args.baseline)
+    report(results, baseline)
+
+    if args.save:
+        save_baseline(args.baseline, results)
+        print("\nSaved baseline to {}".format(args.baseline))
+        return 0
+
+    if baseline is None:
+        print("\nNo baseline at {}; run with --save to create one.".format(args.baseline))
+        return 0
+
+    regressions = compare(results, baseline, args.threshold)
+    for name, value, reference, change in regressions:
+        print("REGRESSION {}: {:,.0f} vs {:,.0f} ({:+.1%})".format(
+            name, value, reference, change))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,12 @@ champions) in a tournament.
 """
 import random
 
+import game_agent
+from move_ordering import MoveOrderer
+from opening_book import OpeningBook
+from time_manager import TimeManager
+from transposition import TranspositionTable
+
 
 class SearchTimeout(Exception):
     """Subclass base exception for code clarity. """
@@ -33,10 +39,10 @@ def custom_score(game, player):
     float
         The heuristic value of the current game state to the specified player.
     """
-    raise NotImplementedError
+    return game_agent.custom_score(game, player)
 
 
-class CustomPlayer:
+class CustomPlayer(game_agent.AlphaBetaPlayer):
     """Game-playing agent to use in the optional player vs player Isolation
     competition.
 
@@ -62,9 +68,11 @@ class CustomPlayer:
     """
 
     def __init__(self, data=None, timeout=1.):
-        self.score = custom_score
-        self.time_left = None
-        self.TIMER_THRESHOLD = timeout
+        game_agent.AlphaBetaPlayer.__init__(
+            self, score_fn=custom_score, timeout=timeout,
+            transposition_table=TranspositionTable(), move_orderer=MoveOrderer(),
+            pvs=True, endgame=True, opening_book=OpeningBook(),
+            time_manager=TimeManager(check_ms=0.5))
 
     def get_move(self, game, time_left):
         """Search for the best move from the available legal moves and return a
@@ -93,5 +101,7 @@ class CustomPlayer:
             Board coordinates corresponding to a legal move; may return
             (-1, -1) if there are no available legal moves.
         """
-        # OPTIONAL: Finish this function!
-        raise NotImplementedError
+        # Positions in the opening book are answered without searching,
+        # partitioned endgames are solved exactly, and everything else goes
+        # through iterative deepening PVS
+        return game_agent.AlphaBetaPlayer.get_move(self, game, time_left)
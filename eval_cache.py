@@ -0,0 +1,82 @@
+"""This file contains a memoizing wrapper for the heuristic functions used by
+the search agents in game_agent.py.
+
+Iterative deepening scores many of the leaves of depth d again at depth
+d + 1, and the two players of a game meet the same positions on consecutive
+turns. `EvalCache` wraps any `score_fn(game, player)` and remembers its
+results under the key `game.perspective_key(player)`, the incrementally
+updated Zobrist key of the position salted with the side of `player`, so a
+lookup costs one dict access instead of a call to the heuristic.
+
+The key covers the blocked squares, the player locations and the side to
+move, and so also the move count (every move blocks one square): it holds
+everything the bundled heuristics depend on. A cache must only be used on
+boards of a single size, and with a single heuristic.
+
+The cache holds at most `size` scores and evicts the least recently used
+one when it is full.
+"""
+from collections import OrderedDict
+
+DEFAULT_SIZE = 2**16
+
+
+class EvalCache(object):
+    """Heuristic function memoizing the scores of `score_fn`.
+
+    Parameters
+    ----------
+    score_fn : callable
+        The heuristic to wrap, called as `score_fn(game, player)`.
+
+    size : int (optional)
+        The maximum number of scores held by the cache.
+    """
+
+    def __init__(self, score_fn, size=DEFAULT_SIZE):
+        if size < 1:
+            raise ValueError("An evaluation cache needs at least 1 entry.")
+        self.score_fn = score_fn
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._scores = OrderedDict()
+        self.__name__ = getattr(score_fn, "__name__", type(self).__name__)
+
+    def __call__(self, game, player):
+        key = game.perspective_key(player)
+        scores = self._scores
+        score = scores.get(key)
+        if score is not None:
+            self.hits += 1
+            scores.move_to_end(key)
+            return score
+        self.misses += 1
+        score = scores[key] = self.score_fn(game, player)
+        if len(scores) > self.size:
+            scores.popitem(last=False)
+            self.evictions += 1
+        return score
+
+    def __len__(self):
+        return len(self._scores)
+
+    def clear(self):
+        """Drop every cached score and reset the counters. """
+        self._scores.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """Return a dict with the hit, miss and eviction counters and the
+        number of scores held.
+        """
+        calls = self.hits + self.misses
+        return {
+            "size": self.size,
+            "used": len(self._scores),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / calls if calls else 0.,
+        }
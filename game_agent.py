@@ -2,45 +2,93 @@
 test your agent's strength against a set of known agents using tournament.py
 and include the results in your report.
 """
+import math
 import random
 
+# The bound flags of the transposition table entries (see transposition.py).
+# The optional subsystems of the search agents (transposition.py,
+# move_ordering.py, isolation.endgame, ...) are only imported where they are
+# enabled, so this file imports with the stock isolation package alone.
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# The share of the time left for a move that the endgame solver may use
+ENDGAME_TIME_SHARE = 0.25
+
 
 class SearchTimeout(Exception):
     """Subclass base exception for code clarity. """
     pass
 
 
-def custom_score(game, player):
+def effective_branching_factor(nodes, depth):
+    """Return the branching factor b of a uniform tree of the given depth with
+    the given number of nodes, i.e., nodes ** (1 / depth).
+    """
+    if depth < 1 or nodes < 1:
+        return 0.
+    return nodes ** (1. / depth)
+
 
-    if game.is_loser(player):
-        return float("-inf")
+def unwind(game, move_count):
+    """Pop the moves pushed on `game` by a search that was interrupted, until
+    the board is back to `move_count` moves.
+    """
+    while game.move_count > move_count:
+        game.pop_move()
 
-    if game.is_winner(player):
-        return float("inf")
 
-    return blocking_improved_score(game, player)
+def above(x):
+    """Return the smallest float greater than `x`. A search with the null
+    window (alpha, above(alpha)) tells whether a node scores more than alpha:
+    no score falls strictly inside the window, so every result is a proven
+    bound.
+    """
+    return math.nextafter(x, math.inf)
 
 
-def custom_score_2(game, player):
+def below(x):
+    """Return the greatest float less than `x` (see above()). """
+    return math.nextafter(x, -math.inf)
 
-    if game.is_loser(player):
-        return float("-inf")
 
-    if game.is_winner(player):
-        return float("inf")
+def custom_score(game, player):
+    """`blocking_improved_score`, with the terminal states scored as wins and
+    losses. The terminal test and the move counts come from a single
+    `evaluate_state()` call.
+    """
+    utility, own_moves, opp_moves = game.evaluate_state(player)
+    if utility:
+        return utility
+
+    return float(own_moves - (2 * opp_moves))
 
-    return decrease_blocking_improved_score(game, player)
 
+def custom_score_2(game, player):
+    """`decrease_blocking_improved_score`, with the terminal states scored as
+    wins and losses (see `custom_score`).
+    """
+    utility, own_moves, opp_moves = game.evaluate_state(player)
+    if utility:
+        return utility
 
-def custom_score_3(game, player):
+    move_count_factor = 0.5 * game.move_count
+    blocking_factor = (2 * opp_moves - move_count_factor)
+    return float((own_moves - blocking_factor))
 
-    if game.is_loser(player):
-        return float("-inf")
 
-    if game.is_winner(player):
-        return float("inf")
+def custom_score_3(game, player):
+    """`increase_blocking_improved_score`, with the terminal states scored as
+    wins and losses (see `custom_score`).
+    """
+    utility, own_moves, opp_moves = game.evaluate_state(player)
+    if utility:
+        return utility
 
-    return increase_blocking_improved_score(game, player)
+    move_count_factor = 0.5 * game.move_count
+    blocking_factor = (opp_moves + move_count_factor)
+    return float((own_moves - blocking_factor))
 
 
 def blocking_improved_score(game, player):
@@ -50,8 +98,7 @@ def blocking_improved_score(game, player):
     By setting the weight to 2, we assure a rather aggressive defense.
     """
 
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
+    _, own_moves, opp_moves = game.evaluate_state(player)
 
     return float(own_moves - (2 * opp_moves))
 
@@ -64,14 +111,13 @@ def decrease_blocking_improved_score(game, player):
     will become fewer legal moves and therefore the blocking effect should become smaller and smaller.
     """
 
-    own_moves = game.get_legal_moves(player)
-    opp_moves = game.get_legal_moves(game.get_opponent(player))
+    _, own_moves, opp_moves = game.evaluate_state(player)
 
     move_count_factor = 0.5 * game.move_count
 
-    blocking_factor = (2 * len(opp_moves) - move_count_factor)
+    blocking_factor = (2 * opp_moves - move_count_factor)
 
-    return float((len(own_moves) - blocking_factor))
+    return float((own_moves - blocking_factor))
 
 
 def increase_blocking_improved_score(game, player):
@@ -82,14 +128,72 @@ def increase_blocking_improved_score(game, player):
     blocking effect.
     """
 
-    own_moves = game.get_legal_moves(player)
-    opp_moves = game.get_legal_moves(game.get_opponent(player))
+    _, own_moves, opp_moves = game.evaluate_state(player)
 
     move_count_factor = 0.5 * game.move_count
 
-    blocking_factor = (len(opp_moves) + move_count_factor)
+    blocking_factor = (opp_moves + move_count_factor)
+
+    return float((own_moves - blocking_factor))
 
-    return float((len(own_moves) - blocking_factor))
+
+# The weights of WeightedScore; the defaults reproduce custom_score
+DEFAULT_WEIGHTS = {
+    "own_moves": 1.,
+    "opp_moves": -2.,
+    "move_count": 0.,
+    "own_two_step": 0.,
+    "opp_two_step": 0.,
+}
+
+
+class WeightedScore(object):
+    """Heuristic scoring the non-terminal states with a weighted sum of
+    features, so that its weights can be tuned (see tuning.py):
+
+        own_moves * (legal moves of the player)
+        + opp_moves * (legal moves of the opponent)
+        + move_count * (number of moves played)
+        + own_two_step * (second-order mobility of the player)
+        + opp_two_step * (second-order mobility of the opponent)
+
+    where the second-order mobility is computed like in lookahead_scores.py,
+    only if one of its weights is not zero. The weights of custom_score,
+    custom_score_2 and custom_score_3 are (1, -2, 0), (1, -2, 0.5) and
+    (1, -1, -0.5), with no second-order terms.
+
+    Parameters
+    ----------
+    weights : dict (optional)
+        Weights overriding DEFAULT_WEIGHTS, by feature name.
+    """
+
+    def __init__(self, weights=None):
+        self.weights = dict(DEFAULT_WEIGHTS)
+        for name, weight in (weights or {}).items():
+            if name not in DEFAULT_WEIGHTS:
+                raise ValueError("Unknown feature: {}".format(name))
+            self.weights[name] = float(weight)
+        self.__name__ = type(self).__name__
+
+    def __call__(self, game, player):
+        utility, own_moves, opp_moves = game.evaluate_state(player)
+        if utility:
+            return utility
+
+        weights = self.weights
+        score = (weights["own_moves"] * own_moves + weights["opp_moves"] * opp_moves +
+                 weights["move_count"] * game.move_count)
+        if weights["own_two_step"] or weights["opp_two_step"]:
+            from lookahead_scores import two_step_counts
+            own_two_step, opp_two_step = two_step_counts(game, player,
+                                                         game.get_opponent(player))
+            score += (weights["own_two_step"] * own_two_step +
+                      weights["opp_two_step"] * opp_two_step)
+        return float(score)
+
+    def __repr__(self):
+        return "WeightedScore({!r})".format(self.weights)
 
 
 class IsolationPlayer:
@@ -121,48 +225,132 @@ class IsolationPlayer:
         self.TIMER_THRESHOLD = timeout
 
 
-class MinimaxPlayer(IsolationPlayer):
+class SearchPlayer(IsolationPlayer):
+    """Base class for the search agents, adding to IsolationPlayer the
+    instrumentation, time management and pondering hooks that they share.
+    Subclasses implement choose_move(game), which get_move() calls once the
+    clock is set.
+
+    Set the `stats` attribute to a `search_stats.SearchStats` instance to
+    record the nodes, depth, cutoffs and time spent in every move, and the
+    `time_manager` attribute to a `time_manager.TimeManager` instance to read
+    the clock every few nodes instead of at every node.
+    """
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.):
+        IsolationPlayer.__init__(self, search_depth, score_fn, timeout)
+        self.stats = None
+        self.time_manager = None
+        self.search_stats = {}
+        self.nodes = 0
+        self.cutoffs = 0
+
+    def get_move(self, game, time_left):
+        """Search for the best move in `game` with choose_move(), recording it
+        in `stats` if instrumentation is enabled.
+        """
+        self.time_left = time_left
+        if self.time_manager is not None:
+            self.time_manager.start(time_left, self.TIMER_THRESHOLD)
+        stats = self.stats
+        if stats is None:
+            return self.choose_move(game)
+
+        stats.begin_move(game)
+        score = self.score
+        self.score = stats.timed_score(score)
+        try:
+            move = self.choose_move(game)
+        finally:
+            self.score = score
+        stats.end_move(self, game, move, self.search_stats.get("source", "search"),
+                       self.search_stats.get("timed_out", False))
+        return move
+
+    def legal_moves(self, game):
+        """Return the legal moves of the active player, timed by `stats` if
+        instrumentation is enabled.
+        """
+        if self.stats is None:
+            return game.get_legal_moves()
+        return self.stats.legal_moves(game)
+
+    def check_time(self):
+        """Raise SearchTimeout if the search must stop. """
+        if self.time_manager is None:
+            if self.time_left() < self.TIMER_THRESHOLD:
+                raise SearchTimeout()
+        elif self.time_manager.tick():
+            raise SearchTimeout()
+
+    def start_pondering(self, game):
+        """Called by `Board.play(ponder=True)` when the opponent starts
+        thinking about its move in `game`. Players that search during the
+        opponent's turn override it.
+        """
+        pass
+
+    def stop_pondering(self):
+        """Called by `Board.play(ponder=True)` when the opponent has chosen
+        its move.
+        """
+        pass
+
+class MinimaxPlayer(SearchPlayer):
     """Game-playing agent that chooses a move using depth-limited minimax
     search. You must finish and test this player to make sure it properly uses
     minimax to return a good move before the search time limit expires.
     """
 
-    def get_move(self, game, time_left):
+    def choose_move(self, game):
 
-        self.time_left = time_left
         best_move = (-1, -1)
+        self.nodes = 0
+        self.search_stats = {"depth": 0, "nodes": 0, "cutoffs": 0,
+                             "source": "search", "timed_out": True}
 
         try:
-            return self.minimax(game, self.search_depth)
+            best_move = self.minimax(game, self.search_depth)
+            self.search_stats["depth"] = self.search_depth
+            self.search_stats["timed_out"] = False
 
         except SearchTimeout:
             pass  # Handle any actions required after timeout as needed
 
+        self.search_stats["nodes"] = self.nodes
+
         # Return the best move from the last completed search iteration
         return best_move
 
     def minimax(self, game, depth):
 
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise SearchTimeout()
+        self.nodes += 1
+        self.check_time()
 
         current_best = float("-inf")
         current_best_move = (-1, -1)
+        move_count = game.move_count
 
-        for idx, action in enumerate(game.get_legal_moves()):
+        try:
+            for idx, action in enumerate(self.legal_moves(game)):
+
+                game.push_move(action)
+                v = self.min_value(game, depth -1)
+                game.pop_move()
 
-            v = self.min_value(game.forecast_move(action), depth -1)
+                if v >= current_best:
+                    current_best = v
+                    current_best_move = action
 
-            if v >= current_best:
-                current_best = v
-                current_best_move = action
+        except SearchTimeout:
+            unwind(game, move_count)
+            raise
 
         return current_best_move
 
     def cut_off(self, depth, game):
 
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise SearchTimeout()
+        self.nodes += 1
+        self.check_time()
 
         if depth == 0:
             return True
@@ -176,8 +364,10 @@ class MinimaxPlayer(IsolationPlayer):
 
         v = float("inf")
 
-        for action in game.get_legal_moves():
-            v = min(v, self.max_value(game.forecast_move(action), depth -1))
+        for action in self.legal_moves(game):
+            game.push_move(action)
+            v = min(v, self.max_value(game, depth -1))
+            game.pop_move()
 
         return v
 
@@ -187,34 +377,206 @@ class MinimaxPlayer(IsolationPlayer):
             return self.score(game, self)
 
         v = float("-inf")
-        for action in game.get_legal_moves():
-            v = max(v, self.min_value(game.forecast_move(action), depth -1))
+        for action in self.legal_moves(game):
+            game.push_move(action)
+            v = max(v, self.min_value(game, depth -1))
+            game.pop_move()
 
         return v
 
 
-class AlphaBetaPlayer(IsolationPlayer):
+class AlphaBetaPlayer(SearchPlayer):
     """Game-playing agent that chooses a move using iterative deepening minimax
     search with alpha-beta pruning. You must finish and test this player to
     make sure it returns a good move before the search time limit expires.
+
+    Parameters
+    ----------
+    transposition_table : `transposition.TranspositionTable` (optional)
+        A table used to store and reuse search results by position. The
+        table is kept by the player across calls to get_move(), so one
+        instance carries results over between the turns of a game. The
+        stored scores are from this player's point of view, so a table
+        must not be shared between players.
+
+    symmetry_plies : int (optional)
+        Positions with fewer than this many moves played are stored in the
+        transposition table under the key of their canonical representative
+        (see `isolation.Board.canonical_key`), so the up to eight symmetric
+        images of a position share one entry. Computing the canonical key is
+        much slower than the incremental Zobrist key, so this only pays off
+        in the first plies of the game, where symmetric positions are met.
+
+    move_orderer : `move_ordering.MoveOrderer` (optional)
+        Sorts the moves of every node before they are searched, trying the
+        best move of the previous iteration (or the transposition table's
+        best move) first, then killer moves, then moves by history score.
+
+    pvs : bool (optional)
+        Use principal variation search: the first move of every node is
+        searched with the full (alpha, beta) window and the others with a
+        null window (alpha, above(alpha)), re-searching only the moves that
+        fail high.
+
+    aspiration_window : float (optional)
+        If set, every iteration after the first is searched with the window
+        (score - aspiration_window, score + aspiration_window) centered on
+        the score of the previous iteration, and re-searched with the full
+        window when the result falls outside of it.
+
+    endgame : bool (optional)
+        Solve the position exactly with `isolation.endgame` before searching
+        once the players are in separate regions of the board, and play the
+        first move of the longest path without searching at all. The solver
+        gives up after ENDGAME_TIME_SHARE of the time left above the
+        threshold, and the search gets the rest.
+
+    opening_book : `opening_book.OpeningBook` (optional)
+        A book of precomputed moves for the early plies; positions found in
+        it are answered without searching. The book file is only read the
+        first time it is consulted.
+
+    time_manager : `time_manager.TimeManager` (optional)
+        Reads the clock every few nodes instead of at every node, and stops
+        iterative deepening as soon as the next depth is not expected to
+        finish in time.
+
+    ponderer : `ponder.Ponderer` (optional)
+        Search the predicted reply of the opponent in a background process
+        during its turn, when the game is played with
+        `Board.play(ponder=True)`. Requires a transposition table, into which
+        the results are merged when the prediction is right. The ponderer
+        does nothing without a spare CPU core or where processes cannot be
+        forked (see ponder.py).
+
+    After each call to get_move(), `search_stats` holds the depth of the last
+    completed iteration, the number of nodes visited, the number of cutoffs,
+    the effective branching factor of the last completed iteration, whether
+    the search was interrupted by a timeout and the source of the move
+    ("search", "book" or "endgame"), and the depth searched while pondering
+    on the position (0 unless the opponent played the predicted move).
     """
 
-    def get_move(self, game, time_left):
+    def __init__(self, search_depth=3, score_fn=custom_score, timeout=10.,
+                 transposition_table=None, move_orderer=None, pvs=False,
+                 aspiration_window=None, endgame=False, opening_book=None,
+                 symmetry_plies=0, time_manager=None, ponderer=None):
+        SearchPlayer.__init__(self, search_depth, score_fn, timeout)
+        self.transposition_table = transposition_table
+        self.move_orderer = move_orderer
+        self.pvs = pvs
+        self.aspiration_window = aspiration_window
+        self.endgame = endgame
+        self.opening_book = opening_book
+        self.symmetry_plies = symmetry_plies
+        self.time_manager = time_manager
+        self.ponderer = ponderer
+        self.best_score = None
+        self._previous_best = None
+
+    def choose_move(self, game):
 
-        self.time_left = time_left
         best_move = (-1, -1)
 
+        if self.transposition_table is not None:
+            self.transposition_table.new_search()
+        if self.move_orderer is not None:
+            self.move_orderer.new_search()
+
+        self.nodes = self.cutoffs = 0
+        self._previous_best = None
+        completed_depth, completed_nodes = 0, 0
+
+        ponder_depth = 0
+        if self.ponderer is not None and self.transposition_table is not None:
+            ponder_depth = self.ponderer.merge(self, game)
+
+        if self.opening_book is not None:
+            book_move = self.opening_book.lookup(game)
+            if book_move is not None:
+                self.search_stats = {"depth": 0, "nodes": 0, "cutoffs": 0, "ebf": 0.,
+                                     "source": "book", "timed_out": False,
+                                     "ponder_depth": ponder_depth}
+                return book_move
+
+        if self.endgame:
+            from isolation import endgame
+            left = self.time_left()
+            stop = left - ENDGAME_TIME_SHARE * (left - self.TIMER_THRESHOLD)
+            solved = endgame.solve(game, time_left=lambda: self.time_left() - stop)
+            if solved is not None and solved[0] is not None:
+                self.search_stats = {"depth": 0, "nodes": 0, "cutoffs": 0, "ebf": 0.,
+                                     "source": "endgame", "timed_out": False,
+                                     "ponder_depth": ponder_depth}
+                return solved[0]
+
+        timed_out = False
+
         try:
             depth = 1
             while True:
-                best_move = self.alphabeta(game, depth)
+                start_nodes = self.nodes
+                best_move = self.aspiration_search(game, depth)
+                completed_depth, completed_nodes = depth, self.nodes - start_nodes
+                self._previous_best = best_move
                 depth += 1
+                if (self.time_manager is not None and
+                        not self.time_manager.next_iteration()):
+                    break
 
         except SearchTimeout:
-            pass  # Handle any actions required after timeout as needed
+            timed_out = True  # Handle any actions required after timeout as needed
 
         finally:
+            self.search_stats = {
+                "depth": completed_depth,
+                "nodes": self.nodes,
+                "cutoffs": self.cutoffs,
+                "ebf": effective_branching_factor(completed_nodes, completed_depth),
+                "source": "search",
+                "timed_out": timed_out,
+                "ponder_depth": ponder_depth,
+            }
+            return best_move
+
+    def start_pondering(self, game):
+        """Search the position reached by the predicted reply of the
+        opponent in `game` in the background (see ponder.py).
+        """
+        if (self.ponderer is None or not self.ponderer.enabled or
+                self.transposition_table is None):
+            return
+        moves = game.get_legal_moves()
+        predicted = self.hash_move(game)
+        if predicted not in moves:
+            if not moves:
+                return
+            predicted = moves[0]
+        game = game.copy()
+        game.apply_move(predicted)
+        self.ponderer.start(self, game)
+
+    def stop_pondering(self):
+        """Stop the background search started by start_pondering(). """
+        if self.ponderer is not None:
+            self.ponderer.stop()
+
+    def aspiration_search(self, game, depth):
+        """Search `game` to `depth` with an aspiration window around the score
+        of the previous iteration, falling back to a full window search when
+        the score falls outside of it.
+        """
+        previous = self.best_score
+        if (self.aspiration_window is None or depth == 1 or previous is None or
+                previous in (float("inf"), float("-inf"))):
+            return self.alphabeta(game, depth)
+
+        alpha = previous - self.aspiration_window
+        beta = previous + self.aspiration_window
+        best_move = self.alphabeta(game, depth, alpha, beta)
+        if alpha < self.best_score < beta:
             return best_move
+        return self.alphabeta(game, depth)
 
     def alphabeta(self, game, depth, alpha=float("-inf"), beta=float("inf")):
 
@@ -225,38 +587,132 @@ class AlphaBetaPlayer(IsolationPlayer):
         :param depth: current depth
         :param alpha: current alpha - initialized to -inf
         :param beta: current beta - initialized to inf
-        :return: best move found using alpha-beta pruning
+        :return: best move found using alpha-beta pruning; its (fail-soft)
+                 score is left in self.best_score
         """
 
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise SearchTimeout()
+        self.nodes += 1
+        self.check_time()
 
-        legal_moves = game.get_legal_moves()
+        legal_moves = self.legal_moves(game)
+        if self.move_orderer is not None:
+            hash_move = self._previous_best or self.hash_move(game)
+            legal_moves = self.move_orderer.order(game, legal_moves, hash_move)
 
         current_best_move = legal_moves[0]
         current_best_score = alpha
+        alpha_orig = alpha
+        move_count = game.move_count
 
-        for action in legal_moves:
-            v = max(current_best_score, self.min_value(game.forecast_move(action), depth-1, alpha, beta))
-
-            if v > current_best_score:
-                current_best_score = v
-                current_best_move = action
+        try:
+            search_full = True
+            for action in legal_moves:
+                game.push_move(action)
+                if search_full:
+                    v = self.min_value(game, depth-1, alpha, beta)
+                else:
+                    v = self.min_value(game, depth-1, alpha, above(alpha))
+                    if alpha < v < beta:
+                        v = self.min_value(game, depth-1, alpha, beta)
+                game.pop_move()
+                v = max(current_best_score, v)
+
+                if v > current_best_score:
+                    current_best_score = v
+                    current_best_move = action
+
+                if v >= beta:
+                    break
+
+                alpha = max(v, alpha)
+                search_full = not self.pvs
 
-            alpha = max(v, alpha)
+        except SearchTimeout:
+            unwind(game, move_count)
+            raise
 
+        self.store(game, depth, current_best_score, alpha_orig, beta, current_best_move)
+        self.best_score = current_best_score
         return current_best_move
 
     def cut_off(self, depth):
 
-        if self.time_left() < self.TIMER_THRESHOLD:
-            raise SearchTimeout()
+        self.nodes += 1
+        self.check_time()
 
         if depth == 0:
             return True
 
         return False
 
+    def ordered_moves(self, game):
+        """Return the legal moves of the active player in the order they
+        should be searched.
+        """
+        legal_moves = self.legal_moves(game)
+        if self.move_orderer is None:
+            return legal_moves
+        return self.move_orderer.order(game, legal_moves, self.hash_move(game))
+
+    def hash_move(self, game):
+        """Return the best move stored in the transposition table for `game`,
+        or None.
+        """
+        if self.transposition_table is None:
+            return None
+        key, transform = self.position_key(game)
+        move = self.transposition_table.best_move(key)
+        if move is not None and transform:
+            move = game.inverse_transform_move(move, transform)
+        return move
+
+    def position_key(self, game):
+        """Return the transposition table key of `game` and the index of the
+        symmetry that maps stored moves to the canonical frame (0 unless the
+        position is canonicalized, see `symmetry_plies`).
+        """
+        if game.move_count < self.symmetry_plies:
+            return game.canonical_key(self)
+        return game.perspective_key(self), 0
+
+    def probe(self, game, depth, alpha, beta):
+        """Return a stored score for `game` that settles the node within the
+        (alpha, beta) window, or None if the search has to be done.
+        """
+        entry = self.transposition_table.probe(self.position_key(game)[0])
+        if entry is None or entry[1] < depth:
+            return None
+
+        flag, score = entry[2], entry[3]
+        if (flag == EXACT or (flag == LOWER and score >= beta) or
+                (flag == UPPER and score <= alpha)):
+            return score
+        return None
+
+    def store(self, game, depth, v, alpha, beta, best_move):
+        """Record the fail-soft score `v` of a node searched with the window
+        (alpha, beta) in the transposition table, if there is one.
+        """
+        if self.transposition_table is None:
+            return
+
+        if v <= alpha:
+            flag = UPPER
+        elif v >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        key, transform = self.position_key(game)
+        if best_move is not None and transform:
+            best_move = game.transform_move(best_move, transform)
+        self.transposition_table.store(key, depth, flag, v, best_move)
+
+    def record_cutoff(self, game, move, depth):
+        """Count a cutoff caused by `move` and credit it to the move orderer. """
+        self.cutoffs += 1
+        if self.move_orderer is not None:
+            self.move_orderer.record_cutoff(game, move, depth)
+
     def min_value(self, game, depth, alpha, beta):
 
         v = float("inf")
@@ -264,13 +720,34 @@ class AlphaBetaPlayer(IsolationPlayer):
         if self.cut_off(depth):
             return self.score(game, self)
 
-        for action in game.get_legal_moves():
-            v = min(v, self.max_value(game.forecast_move(action), depth -1, alpha, beta))
+        if self.transposition_table is not None:
+            stored = self.probe(game, depth, alpha, beta)
+            if stored is not None:
+                return stored
+
+        alpha_orig, beta_orig = alpha, beta
+        best_move = None
+
+        search_full = True
+        for action in self.ordered_moves(game):
+            game.push_move(action)
+            if search_full:
+                child = self.max_value(game, depth -1, alpha, beta)
+            else:
+                child = self.max_value(game, depth -1, below(beta), beta)
+                if alpha < child < beta:
+                    child = self.max_value(game, depth -1, alpha, beta)
+            game.pop_move()
+            if child < v:
+                v, best_move = child, action
             if v <= alpha:
-                return v
+                self.record_cutoff(game, action, depth)
+                break
 
             beta = min(v, beta)
+            search_full = not self.pvs
 
+        self.store(game, depth, v, alpha_orig, beta_orig, best_move)
         return v
 
     def max_value(self, game, depth, alpha, beta):
@@ -280,12 +757,32 @@ class AlphaBetaPlayer(IsolationPlayer):
         if self.cut_off(depth):
             return self.score(game, self)
 
-        for action in game.get_legal_moves():
-            v = max(v, self.min_value(game.forecast_move(action), depth -1, alpha, beta))
+        if self.transposition_table is not None:
+            stored = self.probe(game, depth, alpha, beta)
+            if stored is not None:
+                return stored
+
+        alpha_orig, beta_orig = alpha, beta
+        best_move = None
+
+        search_full = True
+        for action in self.ordered_moves(game):
+            game.push_move(action)
+            if search_full:
+                child = self.min_value(game, depth -1, alpha, beta)
+            else:
+                child = self.min_value(game, depth -1, alpha, above(alpha))
+                if alpha < child < beta:
+                    child = self.min_value(game, depth -1, alpha, beta)
+            game.pop_move()
+            if child > v:
+                v, best_move = child, action
             if v >= beta:
-                return v
+                self.record_cutoff(game, action, depth)
+                break
 
             alpha = max(v, alpha)
+            search_full = not self.pvs
 
+        self.store(game, depth, v, alpha_orig, beta_orig, best_move)
         return v
-
@@ -0,0 +1,232 @@
+"""Store played games in a compact append-only file and read them back in
+bulk, so that tournament results can be analyzed without replaying games.
+
+A record file starts with a header followed by one record per game:
+
+    header   "<4sB"         magic b"ISOG", version
+    record   "<IQBBBBBH"    size of the rest of the record, board seed
+                            (NO_SEED if unknown), width, height, number of
+                            opening plies, index of the winner (0 for player
+                            1, 1 for player 2), termination code (see
+                            TERMINATIONS), move count n
+             2 x "<B" + s   length and UTF-8 name of player 1 and player 2
+             n x "<B"       move square indices (`row + col * height`)
+             n x "<B"       search depth reached for each move
+             n x "<f"       milliseconds used for each move
+
+Records are only ever appended, so a file can be written by a running
+tournament (see `tournament.py --record`) and read at the same time; a
+record cut short by an interrupted writer is ignored by the reader, and cut
+off the file by the next writer before it appends.
+
+`GameRecordReader` memory-maps the file and only builds an index of record
+offsets on opening: records are decoded when they are accessed, and the
+summary fields of every game can be scanned without decoding the moves.
+"""
+import mmap
+import os
+import struct
+from collections import namedtuple
+
+MAGIC = b"ISOG"
+VERSION = 1
+HEADER = struct.Struct("<4sB")
+RECORD = struct.Struct("<IQBBBBBH")
+NO_SEED = 2**64 - 1
+MAX_DEPTH = 255
+
+# The termination strings returned by Board.play(), indexed by their code
+TERMINATIONS = ("illegal move", "timeout", "forfeit")
+
+GameRecord = namedtuple("GameRecord", [
+    "player_1", "player_2", "seed", "width", "height", "opening_plies",
+    "winner", "termination", "moves", "times", "depths"])
+GameRecord.__doc__ = """A played game. `winner` is 0 if player 1 won and 1 if
+player 2 won; `moves` holds (row, column) pairs, opening moves included, and
+`times` and `depths` the milliseconds used and the search depth reached for
+each move (0 for the opening moves)."""
+
+
+class MoveLog(object):
+    """Per-move callback for `Board.play(on_move=...)` collecting the time
+    used by every move and the search depth reported by the player in its
+    `search_stats` (0 for players that do not report one).
+    """
+
+    def __init__(self):
+        self.times = []
+        self.depths = []
+
+    def __call__(self, player, move, time_used):
+        self.times.append(time_used)
+        self.depths.append(getattr(player, "search_stats", {}).get("depth", 0))
+
+
+def make_record(names, seed, winner_index, termination, history, opening_plies,
+                move_log, width=7, height=7):
+    """Return the `GameRecord` of a game played by the players called
+    `names` from the board seed `seed`, whose move history (opening
+    included) is `history` and whose played moves were logged by `move_log`.
+    """
+    padding = [0] * opening_plies
+    return GameRecord(names[0], names[1], seed, width, height, opening_plies,
+                      winner_index, termination, [tuple(move) for move in history],
+                      padding + move_log.times, padding + move_log.depths)
+
+
+def encode(record):
+    """Return the bytes of `record` in the record file format. """
+    n = len(record.moves)
+    h = record.height
+    names = b"".join(struct.pack("<B", len(name)) + name
+                     for name in (record.player_1.encode("utf-8")[:255],
+                                  record.player_2.encode("utf-8")[:255]))
+    body = (names +
+            bytes(r + c * h for r, c in record.moves) +
+            bytes(min(MAX_DEPTH, max(0, depth)) for depth in record.depths) +
+            struct.pack("<{}f".format(n), *record.times))
+    seed = NO_SEED if record.seed is None else record.seed
+    return RECORD.pack(RECORD.size - 4 + len(body), seed, record.width, h,
+                       record.opening_plies, record.winner,
+                       TERMINATIONS.index(record.termination), n) + body
+
+
+def decode(data, offset=0):
+    """Return the `GameRecord` stored at `offset` in `data`. """
+    (_, seed, width, height, opening_plies, winner, termination,
+     n) = RECORD.unpack_from(data, offset)
+    offset += RECORD.size
+    names = []
+    for _ in range(2):
+        length = data[offset]
+        names.append(bytes(data[offset + 1:offset + 1 + length]).decode("utf-8"))
+        offset += 1 + length
+    moves = [(idx % height, idx // height) for idx in data[offset:offset + n]]
+    depths = list(data[offset + n:offset + 2 * n])
+    times = list(struct.unpack_from("<{}f".format(n), data, offset + 2 * n))
+    return GameRecord(names[0], names[1], None if seed == NO_SEED else seed,
+                      width, height, opening_plies, winner,
+                      TERMINATIONS[termination], moves, times, depths)
+
+
+class GameRecordWriter(object):
+    """Append game records to the record file at `path`, creating it if
+    needed. Every record is flushed as soon as it is written. A record left
+    incomplete at the end of an existing file is truncated first.
+
+    Parameters
+    ----------
+    path : str
+        The record file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            self._file = open(path, "wb")
+            self._file.write(HEADER.pack(MAGIC, VERSION))
+            self._file.flush()
+        else:
+            _check_header(path)
+            self._file = open(path, "r+b")
+            size = os.path.getsize(path)
+            end = HEADER.size
+            if size > HEADER.size:
+                with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    end = _record_offsets(data, size)[1]
+            self._file.truncate(end)
+            self._file.seek(end)
+
+    def write(self, record):
+        """Append `record` (a `GameRecord`) to the file. """
+        self._file.write(encode(record))
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GameRecordReader(object):
+    """Random access to the records of a record file, memory-mapped.
+
+    Parameters
+    ----------
+    path : str
+        The record file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        _check_header(path)
+        self._offsets = []
+        self._data = None
+        size = os.path.getsize(path)
+        if size > HEADER.size:
+            with open(path, "rb") as f:
+                self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._offsets = _record_offsets(self._data, size)[0]
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __getitem__(self, idx):
+        return decode(self._data, self._offsets[idx])
+
+    def __iter__(self):
+        for offset in self._offsets:
+            yield decode(self._data, offset)
+
+    def results(self):
+        """Yield `(player_1, player_2, winner, termination, move count)` for
+        every record, without decoding the moves.
+        """
+        data = self._data
+        for offset in self._offsets:
+            _, _, _, _, _, winner, termination, n = RECORD.unpack_from(data, offset)
+            offset += RECORD.size
+            length_1 = data[offset]
+            length_2 = data[offset + 1 + length_1]
+            yield (bytes(data[offset + 1:offset + 1 + length_1]).decode("utf-8"),
+                   bytes(data[offset + 2 + length_1:offset + 2 + length_1 + length_2]).decode("utf-8"),
+                   winner, TERMINATIONS[termination], n)
+
+    def close(self):
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _record_offsets(data, size):
+    """Return the list of the offsets of the complete records in the first
+    `size` bytes of the record file contents `data`, and the offset where
+    the last of them ends.
+    """
+    offsets = []
+    offset = HEADER.size
+    while offset + RECORD.size <= size:
+        end = offset + 4 + struct.unpack_from("<I", data, offset)[0]
+        if end > size:
+            break
+        offsets.append(offset)
+        offset = end
+    return offsets, offset
+
+
+def _check_header(path):
+    """Raise ValueError if `path` does not start with a record file header. """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size or HEADER.unpack(header) != (MAGIC, VERSION):
+        raise ValueError("{} is not a game record file".format(path))
@@ -0,0 +1,381 @@
+"""
+This file contains the `BitBoard` class, an alternative engine for the game
+Isolation that stores the blocked cells and player positions as integer
+bitboards instead of a Python list.
+
+Squares are indexed exactly like `Board._board_state` (column-major, i.e.
+`row + col * height`), and the knight moves available from every square are
+precomputed once per board size as a bit mask, so generating moves is a
+single AND followed by a walk over the set bits.
+"""
+import random
+
+from .isolation import Board, KNIGHT_DIRECTIONS, square_tables
+from .zobrist import zobrist_table
+
+_MASK_CACHE = {}
+_TWO_STEP_CACHE = {}
+
+
+def knight_masks(width, height):
+    """Return a tuple holding, for every square index on a board of the given
+    size, the bit mask of the squares a knight can reach from it.
+
+    The masks are built the first time a board size is requested and cached
+    for every later call.
+    """
+    key = (width, height)
+    masks = _MASK_CACHE.get(key)
+    if masks is None:
+        masks = []
+        for idx in range(width * height):
+            r, c = idx % height, idx // height
+            mask = 0
+            for dr, dc in KNIGHT_DIRECTIONS:
+                if 0 <= r + dr < height and 0 <= c + dc < width:
+                    mask |= 1 << (r + dr + (c + dc) * height)
+            masks.append(mask)
+        masks = _MASK_CACHE[key] = tuple(masks)
+    return masks
+
+
+def two_step_masks(width, height):
+    """Return a tuple holding, for every square index on a board of the given
+    size, the bit mask of the squares a knight can reach from it in two
+    moves. A knight move always changes the color of the square, so these
+    squares never include the ones reachable in one move; the starting
+    square itself is left out.
+
+    The masks are built from `knight_masks` the first time a board size is
+    requested and cached for every later call.
+    """
+    key = (width, height)
+    masks = _TWO_STEP_CACHE.get(key)
+    if masks is None:
+        one_step = knight_masks(width, height)
+        masks = []
+        for idx, mask in enumerate(one_step):
+            two_step = 0
+            for neighbor in bit_indices(mask):
+                two_step |= one_step[neighbor]
+            masks.append(two_step & ~(1 << idx))
+        masks = _TWO_STEP_CACHE[key] = tuple(masks)
+    return masks
+
+
+def bit_indices(mask):
+    """Return the list of the indices of the bits set in `mask`. """
+    indices = []
+    while mask:
+        low = mask & -mask
+        indices.append(low.bit_length() - 1)
+        mask ^= low
+    return indices
+
+
+class BitBoard(Board):
+    """Implement the Isolation rules of `Board` on top of integer bitboards.
+
+    `BitBoard` is a drop-in replacement for `Board`: it accepts the same
+    constructor arguments and exposes the same public API, so any player
+    written against `Board` can play on it unchanged.
+
+    `BitBoard` never builds `Board._board_state`, so it deliberately does not
+    call `Board.__init__`. Every `Board` method that reads the list is
+    overridden here (`hash`, `copy`, `move_is_legal`, `get_blank_spaces`,
+    `get_player_location`, `get_legal_moves`, `apply_move`, `push_move`,
+    `pop_move`, `to_string`, `_occupancy`, `_permute`, `_location_index`,
+    `open_neighbor_count`, `blocked_mask`, `_mobility`);
+    the methods inherited unchanged (`play`, `forecast_move`, `get_opponent`,
+    ...) only go through that API. A new
+    `Board` method that touches `_board_state` directly must be overridden
+    here as well.
+
+    Parameters
+    ----------
+    player_1 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    player_2 : object
+        An object with a get_move() function. This is the only function
+        directly called by the Board class for each player.
+
+    width : int (optional)
+        The number of columns that the board should have.
+
+    height : int (optional)
+        The number of rows that the board should have.
+
+    shuffle : bool (optional)
+        Whether the legal moves of a placed player are returned in random
+        order (see `Board`).
+
+    rng : `random.Random` (optional)
+        The random number generator used to shuffle the moves (see `Board`).
+    """
+
+    __slots__ = ("_masks", "_full", "_blocked", "_p1_loc", "_p2_loc")
+
+    def __init__(self, player_1, player_2, width=7, height=7, shuffle=True,
+                 rng=None):
+        self.width = width
+        self.height = height
+        self.shuffle = shuffle
+        self.rng = random if rng is None else rng
+        self.move_count = 0
+        self._player_1 = player_1
+        self._player_2 = player_2
+        self._active_player = player_1
+        self._inactive_player = player_2
+
+        self._masks = knight_masks(width, height)
+        self._full = (1 << (width * height)) - 1
+        self._blocked = 0
+        self._p1_loc = Board.NOT_MOVED
+        self._p2_loc = Board.NOT_MOVED
+        self._undo_stack = []
+        self._zobrist = zobrist_table(width, height)
+        self._key = 0
+        self._coords, self._neighbors = square_tables(width, height)
+
+    def hash(self):
+        return hash((self._blocked, self._p1_loc, self._p2_loc, self.move_count & 1))
+
+    def copy(self):
+        """ Return a deep copy of the current board. """
+        new_board = BitBoard.__new__(BitBoard)
+        new_board.width = self.width
+        new_board.height = self.height
+        new_board.shuffle = self.shuffle
+        new_board.rng = self.rng
+        new_board.move_count = self.move_count
+        new_board._player_1 = self._player_1
+        new_board._player_2 = self._player_2
+        new_board._active_player = self._active_player
+        new_board._inactive_player = self._inactive_player
+        new_board._masks = self._masks
+        new_board._full = self._full
+        new_board._blocked = self._blocked
+        new_board._p1_loc = self._p1_loc
+        new_board._p2_loc = self._p2_loc
+        new_board._undo_stack = []
+        new_board._zobrist = self._zobrist
+        new_board._key = self._key
+        new_board._coords = self._coords
+        new_board._neighbors = self._neighbors
+        return new_board
+
+    def move_is_legal(self, move):
+        """Test whether a move is legal in the current game state.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+
+        Returns
+        -------
+        bool
+            Returns True if the move is legal, False otherwise
+        """
+        return (0 <= move[0] < self.height and 0 <= move[1] < self.width and
+                not self._blocked >> (move[0] + move[1] * self.height) & 1)
+
+    def get_blank_spaces(self):
+        """Return a list of the locations that are still available on the board.
+        """
+        coords = self._coords
+        return [coords[idx] for idx in bit_indices(self._full & ~self._blocked)]
+
+    def get_player_location(self, player):
+        """Find the current location of the specified player on the board.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        (int, int) or None
+            The coordinate pair (row, column) of the input player, or None
+            if the player has not moved.
+        """
+        idx = self._location_index(player)
+        if idx == Board.NOT_MOVED:
+            return Board.NOT_MOVED
+        return self._coords[idx]
+
+    def get_legal_moves(self, player=None):
+        """Return the list of all legal moves for the specified player.
+
+        Parameters
+        ----------
+        player : object (optional)
+            An object registered as a player in the current game. If None,
+            return the legal moves for the active player on the board.
+
+        Returns
+        -------
+        list<(int, int)>
+            The list of coordinate pairs (row, column) of all legal moves
+            for the player constrained by the current game state.
+        """
+        if player is None:
+            player = self._active_player
+        idx = self._location_index(player)
+        if idx == Board.NOT_MOVED:
+            return self.get_blank_spaces()
+        coords = self._coords
+        valid_moves = [coords[i] for i in bit_indices(self._masks[idx] & ~self._blocked)]
+        if self.shuffle:
+            self.rng.shuffle(valid_moves)
+        return valid_moves
+
+    def apply_move(self, move):
+        """Move the active player to a specified location.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        idx = move[0] + move[1] * self.height
+        zobrist = self._zobrist
+        if self._active_player == self._player_1:
+            last_loc, self._p1_loc = self._p1_loc, idx
+            location_keys = zobrist.location[0]
+        else:
+            last_loc, self._p2_loc = self._p2_loc, idx
+            location_keys = zobrist.location[1]
+        self._key ^= zobrist.blocked[idx] ^ location_keys[idx] ^ zobrist.side
+        if last_loc != Board.NOT_MOVED:
+            self._key ^= location_keys[last_loc]
+        self._blocked |= 1 << idx
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count += 1
+
+    def push_move(self, move):
+        """Apply a move in-place so that it can be taken back with
+        `pop_move()` (see `Board.push_move`).
+        """
+        self._undo_stack.append((move[0] + move[1] * self.height,
+                                 self._p1_loc, self._p2_loc, self._key))
+        self.apply_move(move)
+
+    def pop_move(self):
+        """Take back the last move applied with `push_move()` and return it
+        (see `Board.pop_move`).
+        """
+        idx, self._p1_loc, self._p2_loc, self._key = self._undo_stack.pop()
+        self._blocked &= ~(1 << idx)
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count -= 1
+        return self._coords[idx]
+
+    def is_winner(self, player):
+        """ Test whether the specified player has won the game. """
+        return player == self._inactive_player and not self._has_moves()
+
+    def is_loser(self, player):
+        """ Test whether the specified player has lost the game. """
+        return player == self._active_player and not self._has_moves()
+
+    def utility(self, player):
+        """Returns the utility of the current game state from the perspective
+        of the specified player (see `Board.utility`).
+        """
+        if not self._has_moves():
+
+            if player == self._inactive_player:
+                return float("inf")
+
+            if player == self._active_player:
+                return float("-inf")
+
+        return 0.
+
+    def to_string(self, symbols=['1', '2']):
+        """Generate a string representation of the current game state, marking
+        the location of each player and indicating which cells have been
+        blocked, and which remain open.
+        """
+        col_margin = len(str(self.height - 1)) + 1
+        prefix = "{:<" + "{}".format(col_margin) + "}"
+        offset = " " * (col_margin + 3)
+        out = offset + '   '.join(map(str, range(self.width))) + '\n\r'
+        for i in range(self.height):
+            out += prefix.format(i) + ' | '
+            for j in range(self.width):
+                idx = i + j * self.height
+                if not self._blocked >> idx & 1:
+                    out += ' '
+                elif self._p1_loc == idx:
+                    out += symbols[0]
+                elif self._p2_loc == idx:
+                    out += symbols[1]
+                else:
+                    out += '-'
+                out += ' | '
+            out += '\n\r'
+
+        return out
+
+    def _occupancy(self):
+        """Return the list of the blocked square indices and the square
+        indices of player 1 and player 2 (or NOT_MOVED).
+        """
+        return bit_indices(self._blocked), (self._p1_loc, self._p2_loc)
+
+    def _permute(self, permutation):
+        """Move every square of the board to its image under the square index
+        `permutation`, in place.
+        """
+        blocked = 0
+        for idx in bit_indices(self._blocked):
+            blocked |= 1 << permutation[idx]
+        self._key = self._permuted_key(permutation)
+        self._blocked = blocked
+        if self._p1_loc != Board.NOT_MOVED:
+            self._p1_loc = permutation[self._p1_loc]
+        if self._p2_loc != Board.NOT_MOVED:
+            self._p2_loc = permutation[self._p2_loc]
+
+    def _location_index(self, player):
+        """Return the square index of `player`, or NOT_MOVED. """
+        if player == self._player_1:
+            return self._p1_loc
+        elif player == self._player_2:
+            return self._p2_loc
+        raise RuntimeError(
+            "`player` must be an object registered as a player in the current game: {}".format(player))
+
+    def blocked_mask(self):
+        """Return the bit mask of the blocked squares (see
+        `Board.blocked_mask`).
+        """
+        return self._blocked
+
+    def open_neighbor_count(self, move):
+        """Return the number of open squares a knight can reach from the
+        square `move` (see `Board.open_neighbor_count`).
+        """
+        return bin(self._masks[move[0] + move[1] * self.height] & ~self._blocked).count("1")
+
+    def _mobility(self, loc):
+        """Return the number of legal moves of a player on the square index
+        `loc` (or NOT_MOVED).
+        """
+        if loc == Board.NOT_MOVED:
+            return bin(self._full & ~self._blocked).count("1")
+        return bin(self._masks[loc] & ~self._blocked).count("1")
+
+    def _has_moves(self):
+        """Test whether the active player has at least one legal move. """
+        idx = self._location_index(self._active_player)
+        if idx == Board.NOT_MOVED:
+            return self._blocked != self._full
+        return bool(self._masks[idx] & ~self._blocked)
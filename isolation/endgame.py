@@ -0,0 +1,163 @@
+"""
+This file contains an exact endgame solver for the game Isolation.
+
+Once no square is reachable by both players, the two knights can no longer
+interfere with each other and the game reduces to which of them can make the
+longer tour of its own region. The solver detects that partition with a
+flood fill over knight moves, and finds the longest path of each player with
+a memoized depth-first search over the bit mask of the squares left open in
+its region.
+
+The player to move loses a partitioned game exactly when its longest path is
+not longer than the opponent's.
+"""
+from .bitboard import bit_indices, knight_masks
+
+DEFAULT_MAX_NODES = 20000
+CLOCK_INTERVAL = 64
+
+
+class SolverLimit(Exception):
+    """Raised internally when a longest path search exceeds its node or time
+    budget.
+    """
+    pass
+
+
+def reachable(start, open_mask, masks):
+    """Return the bit mask of the open squares reachable from the square index
+    `start` through any number of knight moves over open squares.
+    """
+    region = 0
+    frontier = masks[start] & open_mask
+    while frontier:
+        region |= frontier
+        expanded = 0
+        for idx in bit_indices(frontier):
+            expanded |= masks[idx]
+        frontier = expanded & open_mask & ~region
+    return region
+
+
+def longest_path(start, open_mask, masks, max_nodes=DEFAULT_MAX_NODES,
+                 time_left=None):
+    """Return `(length, first_move)` for the longest sequence of knight moves
+    from the square index `start` over the squares of `open_mask`, where
+    `first_move` is the square index of its first step (None if there is no
+    move at all).
+
+    Raises `SolverLimit` if the search visits more than `max_nodes` nodes, or
+    if `time_left()` (read every CLOCK_INTERVAL nodes) is no longer positive.
+    """
+    memo = {}
+    budget = [max_nodes]
+
+    def search(loc, free):
+        key = (loc, free)
+        if key in memo:
+            return memo[key]
+        budget[0] -= 1
+        if budget[0] < 0:
+            raise SolverLimit()
+        if (time_left is not None and not budget[0] % CLOCK_INTERVAL and
+                time_left() <= 0):
+            raise SolverLimit()
+
+        best, best_move = 0, None
+        bound = bin(free).count("1")
+        for idx in bit_indices(masks[loc] & free):
+            length = 1 + search(idx, free & ~(1 << idx))[0]
+            if length > best:
+                best, best_move = length, idx
+                if best == bound:
+                    break
+        memo[key] = (best, best_move)
+        return memo[key]
+
+    return search(start, reachable(start, open_mask, masks))
+
+
+def _state(game):
+    """Return the knight masks, the open mask and the square indices of the
+    active and inactive players of `game`, or None if a player has not been
+    placed yet.
+    """
+    h = game.height
+    locations = []
+    for player in (game.active_player, game.inactive_player):
+        loc = game.get_player_location(player)
+        if loc is None:
+            return None
+        locations.append(loc[0] + loc[1] * h)
+    open_mask = 0
+    for r, c in game.get_blank_spaces():
+        open_mask |= 1 << (r + c * h)
+    return knight_masks(game.width, game.height), open_mask, locations
+
+
+def is_partitioned(game):
+    """Test whether the two players of `game` can no longer reach any common
+    square, i.e., whether the endgame solver applies.
+    """
+    state = _state(game)
+    if state is None:
+        return False
+    masks, open_mask, (active, inactive) = state
+    return not (reachable(active, open_mask, masks) &
+                reachable(inactive, open_mask, masks))
+
+
+def solve(game, max_nodes=DEFAULT_MAX_NODES, time_left=None):
+    """Solve a partitioned game exactly.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        The game state to solve.
+
+    max_nodes : int (optional)
+        The node budget of each longest path search; the position is left
+        unsolved if it is exceeded.
+
+    time_left : callable (optional)
+        A function returning the number of milliseconds the solver may
+        still use; the position is left unsolved once it is not positive.
+
+    Returns
+    -------
+    ((int, int), bool) or None
+        The best move of the active player (or None if it has no move) and
+        whether the active player wins with it, or None if the players are
+        not in separate regions or the regions are too large to solve
+        within the budgets.
+    """
+    state = _state(game)
+    if state is None:
+        return None
+    masks, open_mask, (active, inactive) = state
+    if reachable(active, open_mask, masks) & reachable(inactive, open_mask, masks):
+        return None
+
+    try:
+        own, first_move = longest_path(active, open_mask, masks, max_nodes, time_left)
+        opp, _ = longest_path(inactive, open_mask, masks, max_nodes, time_left)
+    except SolverLimit:
+        return None
+
+    if first_move is not None:
+        first_move = (first_move % game.height, first_move // game.height)
+    return first_move, own > opp
+
+
+def endgame_utility(game, player, max_nodes=DEFAULT_MAX_NODES, time_left=None):
+    """Return +inf or -inf if the partitioned `game` is a proven win or loss
+    for `player`, or None if it cannot be solved within the budgets (see
+    solve()).
+    """
+    result = solve(game, max_nodes, time_left)
+    if result is None:
+        return None
+    active_wins = result[1]
+    if active_wins == (player == game.active_player):
+        return float("inf")
+    return float("-inf")
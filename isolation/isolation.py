@@ -11,8 +11,46 @@ import random
 import timeit
 from copy import copy
 
+from .symmetry import transforms
+from .zobrist import zobrist_table
+
 TIME_LIMIT_MILLIS = 150
 
+KNIGHT_DIRECTIONS = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
+                     (1, -2), (1, 2), (2, -1), (2, 1)]
+
+_SQUARE_CACHE = {}
+
+
+def square_tables(width, height):
+    """Return the square tables of a board of the given size, as a pair of
+    tuples indexed by square index (`row + col * height`):
+
+      - the coordinate pair (row, column) of every square, so that moves are
+        converted back to the public `(int, int)` form without allocating,
+      - the square indices a knight can reach from every square.
+
+    The tables are built the first time a board size is requested and cached
+    for every later call.
+    """
+    key = (width, height)
+    tables = _SQUARE_CACHE.get(key)
+    if tables is None:
+        coords, neighbors = [], []
+        for idx in range(width * height):
+            r, c = idx % height, idx // height
+            coords.append((r, c))
+            neighbors.append(tuple(r + dr + (c + dc) * height
+                                   for dr, dc in KNIGHT_DIRECTIONS
+                                   if 0 <= r + dr < height and 0 <= c + dc < width))
+        tables = _SQUARE_CACHE[key] = (tuple(coords), tuple(neighbors))
+    return tables
+
+
+def _slot_names(cls):
+    """Return the names of the slots of `cls` and of its base classes. """
+    return [name for klass in cls.__mro__ for name in getattr(klass, "__slots__", ())]
+
 
 class Board(object):
     """Implement a model for the game Isolation assuming each player moves like
@@ -33,13 +71,41 @@ class Board(object):
 
     height : int (optional)
         The number of rows that the board should have.
+
+    shuffle : bool (optional)
+        Whether the legal moves of a placed player are returned in random
+        order. Pass False for a deterministic order, e.g., when a search
+        sorts the moves itself.
+
+    rng : `random.Random` (optional)
+        The random number generator used to shuffle the moves, shared with
+        every copy of the board. Defaults to the global `random` module;
+        pass a seeded generator to make games reproducible.
+
+    Boards have no instance `__dict__` (see `__slots__`), and squares are
+    handled internally as square indices (`row + col * height`); they are
+    only converted to `(row, column)` pairs, taken from the shared table of
+    `square_tables()`, at the API boundary.
+
+    The number of open knight neighbors of every square is updated
+    incrementally by every move, so the number of legal moves of a player
+    (`mobility()`) and the terminal tests (`is_winner()`, `is_loser()`,
+    `utility()`) cost O(1) instead of a move generation.
     """
     BLANK = 0
     NOT_MOVED = None
 
-    def __init__(self, player_1, player_2, width=7, height=7):
+    __slots__ = ("width", "height", "shuffle", "rng", "move_count",
+                 "_player_1", "_player_2", "_active_player", "_inactive_player",
+                 "_board_state", "_undo_stack", "_zobrist", "_key",
+                 "_coords", "_neighbors", "_open_neighbors", "_blocked_mask")
+
+    def __init__(self, player_1, player_2, width=7, height=7, shuffle=True,
+                 rng=None):
         self.width = width
         self.height = height
+        self.shuffle = shuffle
+        self.rng = random if rng is None else rng
         self.move_count = 0
         self._player_1 = player_1
         self._player_2 = player_2
@@ -52,9 +118,162 @@ class Board(object):
         self._board_state[-1] = Board.NOT_MOVED
         self._board_state[-2] = Board.NOT_MOVED
 
+        # Moves applied with push_move() that can be taken back by pop_move()
+        self._undo_stack = []
+
+        # Incrementally updated Zobrist key of the position (see zobrist.py)
+        self._zobrist = zobrist_table(width, height)
+        self._key = 0
+
+        self._coords, self._neighbors = square_tables(width, height)
+        self._open_neighbors = bytearray(map(len, self._neighbors))
+        self._blocked_mask = 0
+
     def hash(self):
         return str(self._board_state).__hash__()
 
+    @property
+    def zobrist_key(self):
+        """A 64-bit Zobrist key of the current position, updated
+        incrementally by every move. Positions with the same blocked cells,
+        player locations and side to move have the same key.
+        """
+        return self._key
+
+    def perspective_key(self, player):
+        """Return the Zobrist key of the current position salted with the
+        identity of `player`, for caches holding values computed from the
+        point of view of one player (e.g., heuristic scores).
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        int
+            `zobrist_key` if `player` is player 1, and a distinct key for
+            the same position if `player` is player 2.
+        """
+        if player == self._player_1:
+            return self._key
+        elif player == self._player_2:
+            return self._key ^ self._zobrist.perspective
+        raise RuntimeError("`player` must be an object registered as a player in the current game.")
+
+    def canonical_key(self, player=None):
+        """Map the current position to its canonical representative among
+        the images of the board under its symmetries (see symmetry.py).
+
+        Parameters
+        ----------
+        player : object (optional)
+            If given, the key is salted with the identity of `player` like
+            `perspective_key()`.
+
+        Returns
+        -------
+        (int, int)
+            The Zobrist key of the canonical representative (the smallest
+            key of all images of the position), and the index of the
+            transform that maps the current position onto it. Moves are
+            mapped to and from the canonical frame with `transform_move()`
+            and `inverse_transform_move()`.
+        """
+        best_key, best_transform = None, 0
+        for idx, (permutation, _) in enumerate(transforms(self.width, self.height)):
+            key = self._permuted_key(permutation)
+            if best_key is None or key < best_key:
+                best_key, best_transform = key, idx
+        if player is not None:
+            best_key ^= self.perspective_key(player) ^ self._key
+        return best_key, best_transform
+
+    def canonicalize(self):
+        """Return `(board, transform)` where `board` is a new board holding
+        the canonical representative of the current position and `transform`
+        is the index of the symmetry that produced it (see `canonical_key`).
+        """
+        _, transform = self.canonical_key()
+        new_board = self.copy()
+        new_board._permute(transforms(self.width, self.height)[transform][0])
+        return new_board, transform
+
+    def transform_move(self, move, transform):
+        """Return the image of `move` under the symmetry `transform`, e.g.,
+        to map a move of this position into its canonical frame.
+        """
+        idx = transforms(self.width, self.height)[transform][0][move[0] + move[1] * self.height]
+        return (idx % self.height, idx // self.height)
+
+    def inverse_transform_move(self, move, transform):
+        """Return the preimage of `move` under the symmetry `transform`, e.g.,
+        to map a move found in the canonical frame back to this position.
+        """
+        return self.transform_move(move, transforms(self.width, self.height)[transform][1])
+
+    def _occupancy(self):
+        """Return the list of the blocked square indices and the square
+        indices of player 1 and player 2 (or NOT_MOVED).
+        """
+        state = self._board_state
+        blocked = [idx for idx in range(self.width * self.height) if state[idx]]
+        return blocked, (state[-1], state[-2])
+
+    def _location_index(self, player):
+        """Return the square index of `player`, or NOT_MOVED. """
+        if player == self._player_1:
+            return self._board_state[-1]
+        elif player == self._player_2:
+            return self._board_state[-2]
+        raise RuntimeError(
+            "`player` must be an object registered as a player in the current game: {}".format(player))
+
+    def _mobility(self, loc):
+        """Return the number of legal moves of a player on the square index
+        `loc` (or NOT_MOVED).
+        """
+        if loc == Board.NOT_MOVED:
+            return self.width * self.height - self.move_count
+        return self._open_neighbors[loc]
+
+    def _permuted_key(self, permutation):
+        """Return the Zobrist key of the image of the current position under
+        the square index `permutation`.
+        """
+        zobrist = self._zobrist
+        blocked, locations = self._occupancy()
+        key = zobrist.side if self.move_count % 2 else 0
+        for idx in blocked:
+            key ^= zobrist.blocked[permutation[idx]]
+        for slot, loc in enumerate(locations):
+            if loc != Board.NOT_MOVED:
+                key ^= zobrist.location[slot][permutation[loc]]
+        return key
+
+    def _permute(self, permutation):
+        """Move every square of the board to its image under the square index
+        `permutation`, in place.
+        """
+        size = self.width * self.height
+        state = self._board_state
+        new_state = [Board.BLANK] * size + state[size:]
+        for idx in range(size):
+            new_state[permutation[idx]] = state[idx]
+        for slot in (-1, -2):
+            if state[slot] != Board.NOT_MOVED:
+                new_state[slot] = permutation[state[slot]]
+        self._key = self._permuted_key(permutation)
+        self._board_state = new_state
+        # Symmetries preserve knight moves, so the counts move with the squares
+        counts = self._open_neighbors
+        new_counts = bytearray(size)
+        for idx in range(size):
+            new_counts[permutation[idx]] = counts[idx]
+        self._open_neighbors = new_counts
+        self._blocked_mask = sum(1 << idx for idx in range(size) if new_state[idx])
+
     @property
     def active_player(self):
         """The object registered as the player holding initiative in the
@@ -91,14 +310,58 @@ class Board(object):
         raise RuntimeError("`player` must be an object registered as a player in the current game.")
 
     def copy(self):
-        """ Return a deep copy of the current board. """
-        new_board = Board(self._player_1, self._player_2, width=self.width, height=self.height)
+        """ Return a deep copy of the current board. The copy starts with an
+        empty undo stack, so moves pushed on the original cannot be popped
+        from it.
+        """
+        new_board = Board.__new__(Board)
+        new_board.width = self.width
+        new_board.height = self.height
+        new_board.shuffle = self.shuffle
+        new_board.rng = self.rng
         new_board.move_count = self.move_count
+        new_board._player_1 = self._player_1
+        new_board._player_2 = self._player_2
         new_board._active_player = self._active_player
         new_board._inactive_player = self._inactive_player
         new_board._board_state = copy(self._board_state)
+        new_board._undo_stack = []
+        new_board._zobrist = self._zobrist
+        new_board._key = self._key
+        new_board._coords = self._coords
+        new_board._neighbors = self._neighbors
+        new_board._open_neighbors = self._open_neighbors[:]
+        new_board._blocked_mask = self._blocked_mask
         return new_board
 
+    def replace_players(self, player_1, player_2):
+        """Return a copy of the board where `player_1` and `player_2` take the
+        places of the current player 1 and player 2, e.g., to hand the
+        position over to player objects living in another process.
+        """
+        new_board = self.copy()
+        new_board._player_1, new_board._player_2 = player_1, player_2
+        if self.move_count % 2:
+            new_board._active_player, new_board._inactive_player = player_2, player_1
+        else:
+            new_board._active_player, new_board._inactive_player = player_1, player_2
+        return new_board
+
+    def __getstate__(self):
+        # The default generator is the `random` module, which cannot be
+        # pickled; it is restored by __setstate__
+        state = {name: getattr(self, name) for name in _slot_names(type(self))
+                 if hasattr(self, name)}
+        if state["rng"] is random:
+            state["rng"] = None
+        return state
+
+    def __setstate__(self, state):
+        if state["rng"] is None:
+            state["rng"] = random
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def forecast_move(self, move):
         """Return a deep copy of the current game with an input move applied to
         advance the game one ply.
@@ -139,8 +402,9 @@ class Board(object):
     def get_blank_spaces(self):
         """Return a list of the locations that are still available on the board.
         """
-        return [(i, j) for j in range(self.width) for i in range(self.height)
-                if self._board_state[i + j * self.height] == Board.BLANK]
+        state = self._board_state
+        return [coords for idx, coords in enumerate(self._coords)
+                if state[idx] == Board.BLANK]
 
     def get_player_location(self, player):
         """Find the current location of the specified player on the board.
@@ -167,9 +431,7 @@ class Board(object):
         else:
             raise RuntimeError(
                 "Invalid player in get_player_location: {}".format(player))
-        w = idx // self.height
-        h = idx % self.height
-        return (h, w)
+        return self._coords[idx]
 
     def get_legal_moves(self, player=None):
         """Return the list of all legal moves for the specified player.
@@ -187,8 +449,30 @@ class Board(object):
             for the player constrained by the current game state.
         """
         if player is None:
-            player = self.active_player
-        return self.__get_moves(self.get_player_location(player))
+            player = self._active_player
+        return self.__get_moves(self._location_index(player))
+
+    def mobility(self, player=None):
+        """Return the number of legal moves of the specified player (the
+        active player if None), i.e., `len(self.get_legal_moves(player))`,
+        in O(1).
+        """
+        if player is None:
+            player = self._active_player
+        return self._mobility(self._location_index(player))
+
+    def blocked_mask(self):
+        """Return the bit mask of the blocked squares, where bit `row + col *
+        height` is set for the square (row, col), as used by the knight move
+        tables of `isolation.bitboard`.
+        """
+        return self._blocked_mask
+
+    def open_neighbor_count(self, move):
+        """Return the number of open squares a knight can reach from the
+        square `move` (a (row, column) pair), in O(1).
+        """
+        return self._open_neighbors[move[0] + move[1] * self.height]
 
     def apply_move(self, move):
         """Move the active player to a specified location.
@@ -201,19 +485,94 @@ class Board(object):
         """
         idx = move[0] + move[1] * self.height
         last_move_idx = int(self.active_player == self._player_2) + 1
+        last_loc = self._board_state[-last_move_idx]
+        location_keys = self._zobrist.location[last_move_idx - 1]
+        self._key ^= (self._zobrist.blocked[idx] ^ location_keys[idx] ^
+                      self._zobrist.side)
+        if last_loc != Board.NOT_MOVED:
+            self._key ^= location_keys[last_loc]
         self._board_state[-last_move_idx] = idx
         self._board_state[idx] = 1
         self._board_state[-3] ^= 1
+        self._blocked_mask |= 1 << idx
+        counts = self._open_neighbors
+        for neighbor in self._neighbors[idx]:
+            counts[neighbor] -= 1
         self._active_player, self._inactive_player = self._inactive_player, self._active_player
         self.move_count += 1
 
+    def push_move(self, move):
+        """Apply a move in-place and remember it so that it can be taken back
+        with `pop_move()`. Unlike `forecast_move()` no new board is allocated,
+        which makes push/pop pairs the cheapest way to walk a game tree.
+
+        Parameters
+        ----------
+        move : (int, int)
+            A coordinate pair (row, column) indicating the next position for
+            the active player on the board.
+        """
+        slot = -(int(self._active_player == self._player_2) + 1)
+        idx = move[0] + move[1] * self.height
+        self._undo_stack.append((idx, slot, self._board_state[slot], self._key))
+        self.apply_move(move)
+
+    def pop_move(self):
+        """Take back the last move applied with `push_move()`, restoring the
+        board to the exact state it had before that move.
+
+        Returns
+        -------
+        (int, int)
+            The coordinate pair (row, column) of the move taken back.
+        """
+        idx, slot, last_loc, self._key = self._undo_stack.pop()
+        self._board_state[idx] = Board.BLANK
+        self._board_state[slot] = last_loc
+        self._board_state[-3] ^= 1
+        self._blocked_mask &= ~(1 << idx)
+        counts = self._open_neighbors
+        for neighbor in self._neighbors[idx]:
+            counts[neighbor] += 1
+        self._active_player, self._inactive_player = self._inactive_player, self._active_player
+        self.move_count -= 1
+        return self._coords[idx]
+
     def is_winner(self, player):
         """ Test whether the specified player has won the game. """
-        return player == self._inactive_player and not self.get_legal_moves(self._active_player)
+        return (player == self._inactive_player and
+                not self._mobility(self._location_index(self._active_player)))
 
     def is_loser(self, player):
         """ Test whether the specified player has lost the game. """
-        return player == self._active_player and not self.get_legal_moves(self._active_player)
+        return (player == self._active_player and
+                not self._mobility(self._location_index(self._active_player)))
+
+    def evaluate_state(self, player):
+        """Return the terminal status of the game and the number of legal
+        moves of both players, in a single O(1) pass.
+
+        Parameters
+        ----------
+        player : object
+            An object registered as a player in the current game.
+
+        Returns
+        -------
+        (float, int, int)
+            The utility of the game for `player` (+inf if it has won, -inf
+            if it has lost, 0 otherwise, see `utility()`), followed by the
+            number of legal moves of `player` and of its opponent.
+        """
+        opponent = self.get_opponent(player)
+        own_moves = self._mobility(self._location_index(player))
+        opp_moves = self._mobility(self._location_index(opponent))
+        if player == self._active_player:
+            if not own_moves:
+                return float("-inf"), own_moves, opp_moves
+        elif not opp_moves:
+            return float("inf"), own_moves, opp_moves
+        return 0., own_moves, opp_moves
 
     def utility(self, player):
         """Returns the utility of the current game state from the perspective
@@ -237,7 +596,7 @@ class Board(object):
             a value of -inf if the player has lost, and a value of 0
             otherwise.
         """
-        if not self.get_legal_moves(self._active_player):
+        if not self._mobility(self._location_index(self._active_player)):
 
             if player == self._inactive_player:
                 return float("inf")
@@ -249,17 +608,16 @@ class Board(object):
 
     def __get_moves(self, loc):
         """Generate the list of possible moves for an L-shaped motion (like a
-        knight in chess).
+        knight in chess) from the square index `loc`.
         """
         if loc == Board.NOT_MOVED:
             return self.get_blank_spaces()
 
-        r, c = loc
-        directions = [(-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                      (1, -2), (1, 2), (2, -1), (2, 1)]
-        valid_moves = [(r + dr, c + dc) for dr, dc in directions
-                       if self.move_is_legal((r + dr, c + dc))]
-        random.shuffle(valid_moves)
+        state, coords = self._board_state, self._coords
+        valid_moves = [coords[idx] for idx in self._neighbors[loc]
+                       if state[idx] == Board.BLANK]
+        if self.shuffle:
+            self.rng.shuffle(valid_moves)
         return valid_moves
 
     def print_board(self):
@@ -295,7 +653,7 @@ class Board(object):
 
         return out
 
-    def play(self, time_limit=TIME_LIMIT_MILLIS):
+    def play(self, time_limit=TIME_LIMIT_MILLIS, ponder=False, on_move=None):
         """Execute a match between the players by alternately soliciting them
         to select a move and applying it in the game.
 
@@ -305,6 +663,17 @@ class Board(object):
             The maximum number of milliseconds to allow before timeout
             during each turn.
 
+        ponder : bool (optional)
+            Let the waiting player think during its opponent's turn: its
+            start_pondering(game) method, if it has one, is called with a
+            copy of the game before the active player is asked for a move,
+            and its stop_pondering() method once the move is returned.
+
+        on_move : callable (optional)
+            A function called as `on_move(player, move, time_used)` after
+            every move applied, with the number of milliseconds the player
+            used to choose it (e.g., `game_records.MoveLog`).
+
         Returns
         ----------
         (player, list<[(int, int),]>, str)
@@ -321,10 +690,19 @@ class Board(object):
             legal_player_moves = self.get_legal_moves()
             game_copy = self.copy()
 
+            waiting = self._inactive_player
+            pondering = ponder and hasattr(waiting, "start_pondering")
+            if pondering:
+                waiting.start_pondering(self.copy())
+
             move_start = time_millis()
             time_left = lambda : time_limit - (time_millis() - move_start)
-            curr_move = self._active_player.get_move(game_copy, time_left)
-            move_end = time_left()
+            try:
+                curr_move = self._active_player.get_move(game_copy, time_left)
+                move_end = time_left()
+            finally:
+                if pondering:
+                    waiting.stop_pondering()
 
             if curr_move is None:
                 curr_move = Board.NOT_MOVED
@@ -339,4 +717,7 @@ class Board(object):
 
             move_history.append(list(curr_move))
 
+            player = self._active_player
             self.apply_move(curr_move)
+            if on_move is not None:
+                on_move(player, curr_move, time_limit - move_end)
@@ -0,0 +1,56 @@
+"""
+This file contains the symmetries of the Isolation board used to map a
+position to a canonical representative.
+
+Rotations and reflections of the board leave the knight-move rules
+unchanged, so positions that are images of each other have the same value
+and their best moves are images of each other. A square board has eight
+symmetries; a rectangular board only has the four that keep its shape
+(identity, the two mirror flips and the half turn).
+
+Each symmetry is stored as a permutation of the square indices (indexed like
+`Board._board_state`, i.e., `row + col * height`).
+"""
+
+_TRANSFORM_CACHE = {}
+
+
+def _coordinate_maps(width, height):
+    """Return the coordinate maps (row, col) -> (row, col) of the board
+    symmetries, paired with the index of their inverse.
+    """
+    w, h = width - 1, height - 1
+    maps = [
+        (lambda r, c: (r, c), 0),
+        (lambda r, c: (h - r, c), 1),
+        (lambda r, c: (r, w - c), 2),
+        (lambda r, c: (h - r, w - c), 3),
+    ]
+    if width == height:
+        maps += [
+            (lambda r, c: (c, r), 4),
+            (lambda r, c: (w - c, h - r), 5),
+            (lambda r, c: (c, h - r), 7),
+            (lambda r, c: (w - c, r), 6),
+        ]
+    return maps
+
+
+def transforms(width, height):
+    """Return the symmetries of a board of the given size as a tuple of
+    `(permutation, inverse)` pairs, where `permutation[idx]` is the image of
+    the square index `idx` and `inverse` is the index of the inverse
+    symmetry in the tuple. Index 0 is always the identity.
+    """
+    key = (width, height)
+    result = _TRANSFORM_CACHE.get(key)
+    if result is None:
+        result = []
+        for coordinate_map, inverse in _coordinate_maps(width, height):
+            permutation = []
+            for idx in range(width * height):
+                r, c = coordinate_map(idx % height, idx // height)
+                permutation.append(r + c * height)
+            result.append((tuple(permutation), inverse))
+        result = _TRANSFORM_CACHE[key] = tuple(result)
+    return result
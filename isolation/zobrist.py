@@ -0,0 +1,54 @@
+"""
+This file contains the Zobrist key tables used by `Board` and `BitBoard` to
+maintain an incremental position hash.
+
+A position key is the XOR of one random 64-bit key for every blocked square,
+one for the square occupied by each player, and one more when player 2 is the
+side to move. Applying a move only XORs a handful of keys in and out, so the
+key of any position is available in O(1).
+
+The tables are generated from a fixed seed for each board size, which keeps
+keys stable across processes and runs (e.g., for keys stored on disk).
+"""
+import random
+
+_TABLE_CACHE = {}
+
+
+class ZobristTable(object):
+    """The random keys for one board size.
+
+    Attributes
+    ----------
+    blocked : tuple<int>
+        The key of each blocked square, indexed like `Board._board_state`.
+
+    location : (tuple<int>, tuple<int>)
+        The keys of the square occupied by player 1 and player 2.
+
+    side : int
+        The key XORed in while player 2 is the side to move.
+
+    perspective : int
+        The key XORed in by `Board.perspective_key` for player 2.
+    """
+
+    def __init__(self, width, height, seed=0x15014710):
+        rng = random.Random(seed ^ (width << 8) ^ height)
+        size = width * height
+        self.blocked = tuple(rng.getrandbits(64) for _ in range(size))
+        self.location = (tuple(rng.getrandbits(64) for _ in range(size)),
+                         tuple(rng.getrandbits(64) for _ in range(size)))
+        self.side = rng.getrandbits(64)
+        self.perspective = rng.getrandbits(64)
+
+
+def zobrist_table(width, height):
+    """Return the `ZobristTable` of the given board size, building it the
+    first time the size is requested.
+    """
+    key = (width, height)
+    table = _TABLE_CACHE.get(key)
+    if table is None:
+        table = _TABLE_CACHE[key] = ZobristTable(width, height)
+    return table
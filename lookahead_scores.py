@@ -0,0 +1,122 @@
+"""Heuristics measuring the mobility of the players one move further than
+the move counts of sample_players.py and game_agent.py.
+
+The second-order mobility of a player is the number of open squares it can
+reach in two knight moves. It is read from the precomputed table of
+`isolation.bitboard.two_step_masks` and the bit mask of the blocked squares
+of the board (`Board.blocked_mask()`), so it costs one AND and one bit count
+instead of a move generation; the intermediate squares are not required to
+be open. Every heuristic here costs about as much as `improved_score`.
+
+All the heuristics have the `score_fn(game, player)` signature of the
+search agents, e.g., `AlphaBetaPlayer(score_fn=lookahead_score)`.
+"""
+from isolation.bitboard import two_step_masks
+
+TWO_STEP_WEIGHT = 0.5
+
+
+def two_step_mobility(game, player):
+    """Return the number of open squares `player` can reach in two knight
+    moves in `game`, or the number of open squares if it is not placed yet.
+    """
+    return two_step_counts(game, player, player)[0]
+
+
+def two_step_counts(game, player, opponent):
+    """Return the second-order mobility of `player` and of `opponent` (see
+    two_step_mobility()), with a single lookup of the table and of the
+    blocked squares.
+    """
+    h = game.height
+    masks = two_step_masks(game.width, h)
+    blocked = game.blocked_mask()
+    counts = []
+    for loc in (game.get_player_location(player), game.get_player_location(opponent)):
+        if loc is None:
+            counts.append(game.width * h - game.move_count)
+        else:
+            counts.append(bin(masks[loc[0] + loc[1] * h] & ~blocked).count("1"))
+    return counts
+
+
+def two_step_score(game, player):
+    """Outputs a score equal to the difference in the second-order mobility
+    of the two players.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : hashable
+        One of the objects registered by the game object as a valid player.
+
+    Returns
+    ----------
+    float
+        The heuristic value of the current game state
+    """
+    utility, _, _ = game.evaluate_state(player)
+    if utility:
+        return utility
+
+    own_two_step, opp_two_step = two_step_counts(game, player, game.get_opponent(player))
+    return float(own_two_step - opp_two_step)
+
+
+def lookahead_score(game, player):
+    """Outputs the difference in the number of moves available to the two
+    players (like `improved_score`) plus the difference in their
+    second-order mobility weighted by TWO_STEP_WEIGHT.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : hashable
+        One of the objects registered by the game object as a valid player.
+
+    Returns
+    ----------
+    float
+        The heuristic value of the current game state
+    """
+    utility, own_moves, opp_moves = game.evaluate_state(player)
+    if utility:
+        return utility
+
+    own_two_step, opp_two_step = two_step_counts(game, player, game.get_opponent(player))
+    return float(own_moves - opp_moves +
+                 TWO_STEP_WEIGHT * (own_two_step - opp_two_step))
+
+
+def blocking_lookahead_score(game, player):
+    """Like `lookahead_score`, with the mobility of the opponent weighted
+    twice like in `game_agent.blocking_improved_score`.
+
+    Parameters
+    ----------
+    game : `isolation.Board`
+        An instance of `isolation.Board` encoding the current state of the
+        game (e.g., player locations and blocked cells).
+
+    player : hashable
+        One of the objects registered by the game object as a valid player.
+
+    Returns
+    ----------
+    float
+        The heuristic value of the current game state
+    """
+    utility, own_moves, opp_moves = game.evaluate_state(player)
+    if utility:
+        return utility
+
+    own_two_step, opp_two_step = two_step_counts(game, player, game.get_opponent(player))
+    own_mobility = own_moves + TWO_STEP_WEIGHT * own_two_step
+    opp_mobility = opp_moves + TWO_STEP_WEIGHT * opp_two_step
+    return float(own_mobility - 2 * opp_mobility)
@@ -0,0 +1,281 @@
+"""This file contains a Monte Carlo Tree Search (UCT) agent for the game
+Isolation.
+
+`MCTSPlayer` grows a search tree by repeating four steps until its time
+runs out:
+
+  1. selection: from the root, follow the child maximizing the UCB1 bound
+     until reaching a node with untried moves,
+  2. expansion: add a child for one untried move,
+  3. playout: play random moves from the new child to the end of the game,
+  4. backpropagation: credit the result to every node on the path.
+
+and plays the most visited move of the root. The playouts do not go through
+`Board`: they run on the integer bitboard of the position with the knight
+masks of `isolation.bitboard`, so a playout is a loop of AND, random bit
+choice and OR.
+
+Tree nodes are drawn from a pool and returned to it when they are no longer
+reachable. Between two turns, the subtree of the position reached after the
+agent's move and the opponent's reply becomes the new root, so the playouts
+of the previous turn are kept.
+"""
+import math
+import random
+
+from isolation.bitboard import bit_indices, knight_masks
+from game_agent import SearchPlayer
+
+DEFAULT_EXPLORATION = math.sqrt(2)
+DEFAULT_MAX_NODES = 200000
+NOT_PLACED = -1
+
+
+def bitboard_state(game):
+    """Return the bit mask of the blocked squares of `game` and the square
+    indices of its active and inactive players (or NOT_PLACED).
+    """
+    h = game.height
+    blocked = (1 << (game.width * h)) - 1
+    for r, c in game.get_blank_spaces():
+        blocked ^= 1 << (r + c * h)
+    locations = []
+    for player in (game.active_player, game.inactive_player):
+        loc = game.get_player_location(player)
+        locations.append(NOT_PLACED if loc is None else loc[0] + loc[1] * h)
+    return blocked, locations[0], locations[1]
+
+
+def playout(blocked, loc, other, masks, full, rand=random.random):
+    """Play random moves until the end of the game and return True if the
+    player to move at the start loses.
+
+    Parameters
+    ----------
+    blocked : int
+        The bit mask of the blocked squares, including the player squares.
+
+    loc, other : int
+        The square indices of the player to move and of its opponent, or
+        NOT_PLACED before a player is placed.
+
+    masks : tuple<int>
+        The knight move masks of every square (see `knight_masks`).
+
+    full : int
+        The bit mask of every square of the board.
+
+    rand : callable (optional)
+        A function returning random floats in [0, 1).
+    """
+    to_move_loses = True
+    while True:
+        free = (masks[loc] if loc != NOT_PLACED else full) & ~blocked
+        if not free:
+            return to_move_loses
+        indices = bit_indices(free)
+        idx = indices[int(rand() * len(indices))]
+        blocked |= 1 << idx
+        loc, other = other, idx
+        to_move_loses = not to_move_loses
+
+
+class Node(object):
+    """A node of the search tree, for the position reached by playing `move`
+    (a square index) from its parent. `wins` counts the playouts won by the
+    player who played `move`.
+    """
+    __slots__ = ("move", "parent", "children", "untried", "visits", "wins")
+
+    def reset(self, move, parent, untried):
+        self.move = move
+        self.parent = parent
+        self.children = []
+        self.untried = untried
+        self.visits = 0
+        self.wins = 0.
+        return self
+
+
+class NodePool(object):
+    """Recycle tree nodes instead of allocating new ones at every expansion.
+
+    Parameters
+    ----------
+    max_nodes : int (optional)
+        The largest number of nodes alive at once; trees stop growing when
+        the pool is exhausted.
+    """
+
+    def __init__(self, max_nodes=DEFAULT_MAX_NODES):
+        self.max_nodes = max_nodes
+        self.live = 0
+        self._free = []
+
+    def acquire(self, move, parent, untried):
+        """Return a node initialized with the given fields, or None if the
+        pool is exhausted.
+        """
+        if self.live >= self.max_nodes:
+            return None
+        self.live += 1
+        node = self._free.pop() if self._free else Node()
+        return node.reset(move, parent, untried)
+
+    def release(self, node, keep=None):
+        """Return `node` and all of its descendants to the pool, except the
+        subtree rooted at `keep`.
+        """
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node is keep:
+                continue
+            stack.extend(node.children)
+            node.parent = node.children = node.untried = None
+            self._free.append(node)
+            self.live -= 1
+
+
+class MCTSPlayer(SearchPlayer):
+    """Game-playing agent that chooses a move with Monte Carlo Tree Search
+    and UCB1 selection (UCT).
+
+    Parameters
+    ----------
+    exploration : float (optional)
+        The exploration constant of the UCB1 bound.
+
+    timeout : float (optional)
+        Time remaining (in milliseconds) when search is stopped.
+
+    max_nodes : int (optional)
+        The size of the node pool.
+
+    rng : `random.Random` (optional)
+        The random number generator of the playouts and of the expansion
+        order. Defaults to a new unseeded generator.
+
+    After each call to get_move(), `search_stats` holds the number of
+    playouts, the playouts per second, the number of nodes in the tree and
+    the number of visits of the root reused from the previous turn.
+    """
+
+    def __init__(self, exploration=DEFAULT_EXPLORATION, timeout=10.,
+                 max_nodes=DEFAULT_MAX_NODES, rng=None):
+        SearchPlayer.__init__(self, search_depth=0, score_fn=None, timeout=timeout)
+        self.exploration = exploration
+        self.pool = NodePool(max_nodes)
+        self.rng = random.Random() if rng is None else rng
+        self._root = None
+        self._root_state = None
+
+    def choose_move(self, game):
+
+        width, height = game.width, game.height
+        masks = knight_masks(width, height)
+        full = (1 << (width * height)) - 1
+        state = bitboard_state(game)
+        if not (masks[state[1]] if state[1] != NOT_PLACED else full) & ~state[0]:
+            return (-1, -1)
+        root = self._reuse_root(state, game.move_count, masks, full)
+        reused = root.visits
+
+        rand = self.rng.random
+        log, sqrt, exploration = math.log, math.sqrt, self.exploration
+        playouts = 0
+        start_left = self.time_left()
+
+        while self.time_left() >= self.TIMER_THRESHOLD:
+            node = root
+            blocked, loc, other = state
+
+            # selection
+            while not node.untried and node.children:
+                log_visits = log(node.visits)
+                best, best_value = None, -1.
+                for child in node.children:
+                    value = (child.wins / child.visits +
+                             exploration * sqrt(log_visits / child.visits))
+                    if value > best_value:
+                        best, best_value = child, value
+                node = best
+                blocked |= 1 << node.move
+                loc, other = other, node.move
+
+            # expansion
+            if node.untried:
+                untried = node.untried
+                move = untried.pop(int(rand() * len(untried)))
+                new_blocked = blocked | 1 << move
+                free = masks[other] if other != NOT_PLACED else full
+                child = self.pool.acquire(move, node, bit_indices(free & ~new_blocked))
+                if child is not None:
+                    node.children.append(child)
+                    node = child
+                    blocked, loc, other = new_blocked, other, move
+                else:
+                    untried.append(move)
+
+            # playout, from the point of view of the player who moved into node
+            won = playout(blocked, loc, other, masks, full, rand)
+            playouts += 1
+
+            # backpropagation
+            while node is not None:
+                node.visits += 1
+                if won:
+                    node.wins += 1
+                won = not won
+                node = node.parent
+
+        elapsed = (start_left - self.time_left()) / 1000.
+        self.nodes = playouts
+        self.search_stats = {
+            "depth": 0,
+            "nodes": playouts,
+            "cutoffs": 0,
+            "playouts": playouts,
+            "playouts_per_sec": playouts / elapsed if elapsed > 0 else 0.,
+            "tree_nodes": self.pool.live,
+            "reused": reused,
+            "source": "search",
+            "timed_out": False,
+        }
+
+        if root.children:
+            best = max(root.children, key=lambda child: child.visits)
+            return (best.move % height, best.move // height)
+        moves = game.get_legal_moves()
+        return moves[0] if moves else (-1, -1)
+
+    def _reuse_root(self, state, move_count, masks, full):
+        """Return the root node for the position `state`: the grandchild of
+        the previous root reached by this player's last move and the
+        opponent's reply if it matches, or a new node otherwise. Every other
+        node is returned to the pool.
+        """
+        root = None
+        if self._root is not None:
+            previous_blocked, previous_count = self._root_state
+            blocked, loc, other = state
+            if move_count == previous_count + 2:
+                for child in self._root.children:
+                    if child.move != loc:
+                        continue
+                    for grandchild in child.children:
+                        if (grandchild.move == other and
+                                previous_blocked | 1 << loc | 1 << other == blocked):
+                            root = grandchild
+            self.pool.release(self._root, keep=root)
+
+        if root is None:
+            blocked, loc, _ = state
+            free = masks[loc] if loc != NOT_PLACED else full
+            root = self.pool.acquire(NOT_PLACED, None, bit_indices(free & ~blocked))
+        else:
+            root.parent = None
+
+        self._root = root
+        self._root_state = (state[0], move_count)
+        return root
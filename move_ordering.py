@@ -0,0 +1,102 @@
+"""This file contains the move ordering heuristics used by the alpha-beta search
+agents in game_agent.py.
+
+Alpha-beta prunes the most when the best move of a node is searched first.
+`MoveOrderer` sorts the legal moves of a node so that, in order:
+
+  1. the hash move (the best move of the previous iteration, or the one
+     stored for the position in a transposition table) comes first,
+  2. then the killer moves -- moves that caused a cutoff in a sibling node
+     at the same ply during the current search,
+  3. then the remaining moves by their history score, which accumulates
+     `depth ** 2` every time a move to that destination square causes a
+     cutoff anywhere in the tree.
+
+For the ordering to be meaningful, boards should generate moves without
+shuffling them (see the `shuffle` argument of `isolation.Board`).
+"""
+
+KILLER_SLOTS = 2
+
+
+class MoveOrderer(object):
+    """Order moves by hash move, killer moves and history heuristic.
+
+    Parameters
+    ----------
+    killers : bool (optional)
+        Whether killer moves are tried right after the hash move.
+
+    history : bool (optional)
+        Whether the remaining moves are sorted by history score.
+    """
+
+    def __init__(self, killers=True, history=True):
+        self.use_killers = killers
+        self.use_history = history
+        self.killers = {}
+        self.history = {}
+
+    def new_search(self):
+        """Age the history scores at the start of a new search, so that
+        cutoffs found on earlier turns weigh less than recent ones, and drop
+        the killer moves: they are keyed by the move count of the nodes, so
+        most of them belong to plies that the game has already left.
+        """
+        self.killers = {}
+        self.history = {move: score >> 1
+                        for move, score in self.history.items() if score > 1}
+
+    def order(self, game, moves, hash_move=None):
+        """Return the list `moves` of legal moves in `game` sorted in the
+        order in which they should be searched.
+
+        Parameters
+        ----------
+        game : `isolation.Board`
+            The game state the moves are generated from; its `move_count`
+            identifies the ply for the killer moves.
+
+        moves : list<(int, int)>
+            The legal moves of the active player.
+
+        hash_move : (int, int) (optional)
+            The move to search first, if it is legal.
+        """
+        if len(moves) < 2:
+            return moves
+
+        if self.use_history:
+            history = self.history
+            moves = sorted(moves, key=lambda m: history.get(m, 0), reverse=True)
+        else:
+            moves = list(moves)
+
+        first = []
+        if hash_move is not None:
+            first.append(hash_move)
+        if self.use_killers:
+            first.extend(self.killers.get(game.move_count, ()))
+
+        front = 0
+        for move in first:
+            try:
+                idx = moves.index(move, front)
+            except ValueError:
+                continue
+            moves.insert(front, moves.pop(idx))
+            front += 1
+        return moves
+
+    def record_cutoff(self, game, move, depth):
+        """Credit `move` for causing a cutoff in `game` with `depth` plies
+        left to search.
+        """
+        if self.use_killers:
+            killers = self.killers.setdefault(game.move_count, [])
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[KILLER_SLOTS:]
+
+        if self.use_history:
+            self.history[move] = self.history.get(move, 0) + depth * depth
@@ -0,0 +1,180 @@
+"""Build and query an opening book of precomputed moves for the early plies of
+the game.
+
+The book is generated offline by running a deep iterative deepening
+alpha-beta search from every position reachable in the first few plies, after
+reducing the positions by the eight symmetries of the board (rotations and
+reflections leave the knight-move rules unchanged, see
+`isolation.Board.canonical_key`). It is stored in a compact binary file:
+
+    header   "<4sBBBBI" magic b"ISOB", version, width, height, the highest
+                        ply in the book, entry count
+    entries  "<QB"      canonical position key, canonical move square index
+
+and loaded lazily into a dict on the first lookup, so answering a book
+position costs O(1).
+
+Run `python opening_book.py --help` to (re)build the book.
+"""
+import argparse
+import os
+import struct
+import timeit
+
+from isolation import Board
+
+MAGIC = b"ISOB"
+VERSION = 1
+HEADER = struct.Struct("<4sBBBBI")
+ENTRY = struct.Struct("<QB")
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "opening_book.bin")
+DEFAULT_PLIES = 3
+DEFAULT_TIME_LIMIT = 1000.
+
+
+class OpeningBook(object):
+    """Read-only opening book loaded lazily from a binary book file.
+
+    Parameters
+    ----------
+    path : str (optional)
+        The book file to read. A missing file gives an empty book.
+    """
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self.max_ply = -1
+        self.width = self.height = None
+        self._entries = None
+
+    def __len__(self):
+        return len(self._load())
+
+    def lookup(self, game):
+        """Return the book move for `game`, or None if it is not in the book
+        or the book was built for another board size.
+        """
+        entries = self._load()
+        if (not entries or game.move_count > self.max_ply or
+                (game.width, game.height) != (self.width, self.height)):
+            return None
+        key, transform = game.canonical_key()
+        square = entries.get(key)
+        if square is None:
+            return None
+        h = game.height
+        move = game.inverse_transform_move((square % h, square // h), transform)
+        return move if move in game.get_legal_moves() else None
+
+    def _load(self):
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.path):
+                (self._entries, self.max_ply, self.width,
+                 self.height) = read_book(self.path)
+        return self._entries
+
+
+def read_book(path):
+    """Return `(entries, max_ply, width, height)` read from the book file at
+    `path`, where `entries` maps canonical position keys to canonical move
+    square indices and `width` and `height` are the size of the board the
+    book was built for.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, width, height, max_ply, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("{} is not an opening book file".format(path))
+    entries = dict(ENTRY.iter_unpack(data[HEADER.size:HEADER.size + count * ENTRY.size]))
+    return entries, max_ply, width, height
+
+
+def write_book(path, entries, width, height, max_ply):
+    """Write `entries` (canonical key -> canonical move square index) to the
+    book file at `path`.
+    """
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, width, height, max_ply, len(entries)))
+        for key in sorted(entries):
+            f.write(ENTRY.pack(key, entries[key]))
+
+
+def book_positions(plies, width=7, height=7):
+    """Yield the move history of one game for every position reachable in
+    fewer than `plies` moves from the empty board, up to symmetry.
+    """
+    seen = set()
+    frontier = [[]]
+    for ply in range(plies):
+        next_frontier = []
+        for history in frontier:
+            game = _replay(history, 1, 2, width, height)
+            key = game.canonical_key()[0]
+            if key in seen:
+                continue
+            seen.add(key)
+            yield history
+            if ply + 1 < plies:
+                next_frontier.extend(history + [m] for m in game.get_legal_moves())
+        frontier = next_frontier
+
+
+def build_book(plies=DEFAULT_PLIES, time_limit=DEFAULT_TIME_LIMIT, width=7,
+               height=7, score_fn=None, verbose=False):
+    """Search every early position for `time_limit` milliseconds and return
+    the book entries (canonical key -> canonical move square index).
+    """
+    from game_agent import AlphaBetaPlayer, custom_score
+    from move_ordering import MoveOrderer
+    from transposition import TranspositionTable
+
+    entries = {}
+    for history in book_positions(plies, width, height):
+        player = AlphaBetaPlayer(score_fn=score_fn or custom_score,
+                                 transposition_table=TranspositionTable(2**18),
+                                 move_orderer=MoveOrderer(), pvs=True)
+        if len(history) % 2:
+            game = _replay(history, object(), player, width, height)
+        else:
+            game = _replay(history, player, object(), width, height)
+
+        start = timeit.default_timer()
+        time_left = lambda: time_limit - 1000 * (timeit.default_timer() - start)
+        move = player.get_move(game, time_left)
+
+        key, transform = game.canonical_key()
+        r, c = game.transform_move(move, transform)
+        entries[key] = r + c * height
+        if verbose:
+            print("{} -> {} (depth {})".format(history, move,
+                                               player.search_stats["depth"]))
+    return entries
+
+
+def _replay(history, player_1, player_2, width, height):
+    """Return a new board with the moves of `history` applied. """
+    game = Board(player_1, player_2, width, height, shuffle=False)
+    for move in history:
+        game.apply_move(move)
+    return game
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the opening book.")
+    parser.add_argument("--plies", type=int, default=DEFAULT_PLIES,
+                        help="book every position with fewer moves played")
+    parser.add_argument("--time-limit", type=float, default=DEFAULT_TIME_LIMIT,
+                        help="milliseconds of search per position")
+    parser.add_argument("--output", default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    entries = build_book(args.plies, args.time_limit, verbose=True)
+    write_book(args.output, entries, 7, 7, args.plies - 1)
+    print("Wrote {} positions to {}".format(len(entries), args.output))
+
+
+if __name__ == "__main__":
+    main()
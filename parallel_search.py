@@ -0,0 +1,205 @@
+"""This file contains an alpha-beta agent that splits the root of its search
+across a pool of worker processes.
+
+`ParallelAlphaBetaPlayer` runs iterative deepening in the calling process;
+at every depth it searches the root moves in the worker processes, Young
+Brothers Wait style:
+
+  1. the eldest brother (the best move of the previous depth) is searched
+     first with the full window,
+  2. once its score is known, the remaining root moves are searched in
+     parallel with that score as alpha, so they only have to prove that
+     they are not better.
+
+Every worker keeps its own `AlphaBetaPlayer`, transposition table and move
+orderer between tasks, so the results of earlier depths and turns speed up
+later ones. All the processes stop at the same deadline, computed from
+`time_left()` with `time.monotonic()`, which is shared by the processes of
+a machine; the move of the last depth completed before it is returned.
+
+The pool is started on the first call to get_move(). Worker processes
+cannot start pools of their own, so this player cannot be used by
+`tournament.py --workers`.
+"""
+import multiprocessing
+import os
+import time
+
+import game_agent
+from game_agent import AlphaBetaPlayer, custom_score
+from move_ordering import MoveOrderer
+from transposition import TranspositionTable
+
+DEFAULT_TABLE_SIZE = 2**16
+
+# The player of a worker process, set once by _init_worker()
+_worker_player = None
+_worker_search = None
+
+
+def default_workers():
+    """Return the number of CPU cores this process may run on. """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _init_worker(score_fn, table_size):
+    """Create the search player of a pool worker. """
+    global _worker_player
+    _worker_player = AlphaBetaPlayer(score_fn=score_fn, timeout=0.,
+                                     transposition_table=TranspositionTable(table_size),
+                                     move_orderer=MoveOrderer())
+
+
+def _search_move(task):
+    """Search one root move in a pool worker and return `(move, score,
+    nodes)`, where `score` is None if the deadline was reached first.
+    """
+    global _worker_search
+    board, move, depth, alpha, deadline, search_id = task
+    player = _worker_player
+    if search_id != _worker_search:
+        _worker_search = search_id
+        player.transposition_table.new_search()
+        player.move_orderer.new_search()
+
+    if board.move_count % 2:
+        game = board.replace_players("opponent", player)
+    else:
+        game = board.replace_players(player, "opponent")
+    game.apply_move(move)
+
+    player.nodes = 0
+    player.time_left = lambda: 1000. * (deadline - time.monotonic())
+    try:
+        score = player.min_value(game, depth - 1, alpha, float("inf"))
+    except game_agent.SearchTimeout:
+        # Looked up on the module, which raises the current class even if
+        # game_agent has been reloaded since this module was imported
+        score = None
+    return move, score, player.nodes
+
+
+class ParallelAlphaBetaPlayer(AlphaBetaPlayer):
+    """Game-playing agent that searches with iterative deepening alpha-beta,
+    splitting the root moves of every depth across worker processes.
+
+    Parameters
+    ----------
+    workers : int (optional)
+        The number of worker processes; defaults to the number of CPU cores
+        available.
+
+    score_fn : callable (optional)
+        A function to use for heuristic evaluation of game states. It is
+        sent to the workers, so it must be defined at module level.
+
+    timeout : float (optional)
+        Time remaining (in milliseconds) when search is aborted.
+
+    table_size : int (optional)
+        The number of entries of the transposition table of each worker.
+
+    After each call to get_move(), `search_stats` holds the depth of the last
+    completed iteration, the number of nodes visited by all the workers and
+    the number of workers.
+    """
+
+    def __init__(self, workers=None, score_fn=custom_score, timeout=10.,
+                 table_size=DEFAULT_TABLE_SIZE):
+        AlphaBetaPlayer.__init__(self, score_fn=score_fn, timeout=timeout)
+        self.workers = workers or default_workers()
+        self.table_size = table_size
+        self._pool = None
+        self._search_id = 0
+
+    def __getstate__(self):
+        # A pool cannot be pickled; a copy starts its own on first use
+        state = self.__dict__.copy()
+        state["_pool"] = None
+        return state
+
+    def close(self):
+        """Stop the worker processes. """
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def choose_move(self, game):
+
+        moves = game.get_legal_moves()
+        if not moves:
+            return (-1, -1)
+
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(self.workers, _init_worker,
+                                              (self.score, self.table_size))
+        self._search_id += 1
+        self.nodes = 0
+
+        deadline = time.monotonic() + (self.time_left() - self.TIMER_THRESHOLD) / 1000.
+        board = game.replace_players("player_1", "player_2")
+        best_move, completed_depth, timed_out = moves[0], 0, False
+
+        depth = 1
+        while depth <= len(game.get_blank_spaces()):
+            scores = self.search_root(board, moves, depth, deadline)
+            if scores is None:
+                timed_out = True
+                break
+            best_move = max(moves, key=lambda move: scores[move])
+            self.best_score = scores[best_move]
+            completed_depth = depth
+            if self.best_score in (float("inf"), float("-inf")):
+                break
+            moves = [best_move] + [move for move in moves if move != best_move]
+            depth += 1
+
+        self.search_stats = {
+            "depth": completed_depth,
+            "nodes": self.nodes,
+            "cutoffs": 0,
+            "workers": self.workers,
+            "source": "search",
+            "timed_out": timed_out,
+        }
+        return best_move
+
+    def search_root(self, board, moves, depth, deadline):
+        """Search the root `moves` of `board` to `depth` in the workers and
+        return a dict mapping each move to its (fail-soft) score, or None if
+        the deadline is reached first.
+
+        The first move is searched alone; the others are then searched in
+        parallel with its score as alpha.
+        """
+        eldest = self._pool.apply_async(
+            _search_move, ((board, moves[0], depth, float("-inf"), deadline,
+                            self._search_id),))
+        results = [self._wait(eldest, deadline)]
+        if results[0] is None:
+            return None
+
+        alpha = results[0][1]
+        pending = [self._pool.apply_async(
+            _search_move, ((board, move, depth, alpha, deadline, self._search_id),))
+            for move in moves[1:]]
+        for result in pending:
+            results.append(self._wait(result, deadline))
+            if results[-1] is None:
+                return None
+        return {move: score for move, score, _ in results}
+
+    def _wait(self, result, deadline):
+        """Return the `(move, score, nodes)` of a pending worker search, or
+        None if it does not complete before the deadline.
+        """
+        try:
+            move, score, nodes = result.get(max(0., deadline - time.monotonic()))
+        except multiprocessing.TimeoutError:
+            return None
+        self.nodes += nodes
+        if score is None:
+            return None
+        return move, score, nodes
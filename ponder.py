@@ -0,0 +1,134 @@
+"""This file contains the background search used by the alpha-beta agent in
+game_agent.py to think during the opponent's turn ("pondering").
+
+When `Board.play(ponder=True)` asks the opponent for a move, it first calls
+`start_pondering()` on the waiting player. An `AlphaBetaPlayer` with a
+`Ponderer` then predicts the opponent's reply (the best move stored in its
+transposition table for the position) and searches the position it leads
+to in a forked process, which works on a copy of the player's table. When
+the opponent has moved, `stop_pondering()` stops the process and collects
+the table entries it stored. If the opponent played the predicted move, the
+entries are merged into the player's table at the start of its turn, so the
+iterations already searched during the opponent's turn are answered from
+the table.
+
+The background process competes for the CPU with the opponent: on a single
+core, every millisecond it searches is taken from the opponent's turn, so
+the opponent searches less deeply or even runs out of time. A `Ponderer`
+therefore does nothing unless the process may run on at least `min_cpus`
+CPUs. It also does nothing where processes cannot be forked (Windows): the
+player is handed to the background process as is, and it cannot be pickled
+for the spawn and forkserver start methods, e.g., because of its
+`time_left` function.
+"""
+import multiprocessing
+import os
+import time
+
+DEFAULT_MAX_TIME = 60.
+DEFAULT_MIN_CPUS = 2
+
+
+def cpu_count():
+    """Return the number of CPUs the current process may run on. """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def fork_context():
+    """Return the multiprocessing context of the fork start method, or None
+    where it is not available.
+    """
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context("fork")
+
+
+def _ponder(player, game, conn, stop, deadline):
+    """Search `game` with `player` until `stop` is set or the deadline
+    passes, then send the completed depth and the entries stored in the
+    transposition table of `player` back through `conn`.
+    """
+    player.stats = player.time_manager = player.ponderer = None
+    player.TIMER_THRESHOLD = 0.
+    player.time_left = lambda: (-1. if stop.is_set() or time.monotonic() > deadline
+                                else float("inf"))
+    player.choose_move(game)
+
+    table = player.transposition_table
+    conn.send((player.position_key(game)[0], player.search_stats["depth"],
+               table.entries(table.generation)))
+    conn.close()
+
+
+class Ponderer(object):
+    """Run the search of a predicted position in a background process.
+
+    Parameters
+    ----------
+    max_time : float (optional)
+        The number of seconds after which a background search stops by
+        itself, in case it is never stopped.
+
+    min_cpus : int (optional)
+        Only ponder if the process may run on at least this many CPUs.
+    """
+
+    def __init__(self, max_time=DEFAULT_MAX_TIME, min_cpus=DEFAULT_MIN_CPUS):
+        self.max_time = max_time
+        self.context = fork_context()
+        self.enabled = self.context is not None and cpu_count() >= min_cpus
+        self.hits = 0
+        self.misses = 0
+        self._process = None
+        self._result = None
+
+    def start(self, player, game):
+        """Start searching `game`, the position predicted for the next turn
+        of `player`, in a copy of `player` forked in a background process.
+        Does nothing if the ponderer is not `enabled`.
+        """
+        self.stop()
+        self._result = None
+        if not self.enabled:
+            return
+        receiver, sender = self.context.Pipe(duplex=False)
+        self._stop = self.context.Event()
+        self._conn = receiver
+        self._process = self.context.Process(
+            target=_ponder, daemon=True,
+            args=(player, game, sender, self._stop, time.monotonic() + self.max_time))
+        self._process.start()
+        sender.close()
+
+    def stop(self):
+        """Stop the background search, if any, and keep its results. """
+        if self._process is None:
+            return
+        self._stop.set()
+        try:
+            self._result = self._conn.recv()
+        except EOFError:
+            self._result = None
+        self._conn.close()
+        self._process.join()
+        self._process = None
+
+    def merge(self, player, game):
+        """Merge the results of the last background search into the table of
+        `player` if it searched `game`. Returns the depth completed by the
+        background search, or 0 if it searched another position.
+        """
+        self.stop()
+        result, self._result = self._result, None
+        if result is None:
+            return 0
+        key, depth, entries = result
+        if key != player.position_key(game)[0]:
+            self.misses += 1
+            return 0
+        self.hits += 1
+        player.transposition_table.merge(entries)
+        return depth
@@ -6,8 +6,6 @@ own agent and example heuristic functions.
     ************************************************************************
 """
 
-from random import randint
-
 
 def null_score(game, player):
     """This heuristic presumes no knowledge for non-terminal states, and
@@ -30,11 +28,9 @@ def null_score(game, player):
         The heuristic value of the current game state.
     """
 
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
+    utility, _, _ = game.evaluate_state(player)
+    if utility:
+        return utility
 
     return 0.
 
@@ -59,13 +55,11 @@ def open_move_score(game, player):
     float
         The heuristic value of the current game state
     """
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
+    utility, own_moves, _ = game.evaluate_state(player)
+    if utility:
+        return utility
 
-    return float(len(game.get_legal_moves(player)))
+    return float(own_moves)
 
 
 def improved_score(game, player):
@@ -89,14 +83,10 @@ def improved_score(game, player):
     float
         The heuristic value of the current game state
     """
-    if game.is_loser(player):
-        return float("-inf")
+    utility, own_moves, opp_moves = game.evaluate_state(player)
+    if utility:
+        return utility
 
-    if game.is_winner(player):
-        return float("inf")
-
-    own_moves = len(game.get_legal_moves(player))
-    opp_moves = len(game.get_legal_moves(game.get_opponent(player)))
     return float(own_moves - opp_moves)
 
 
@@ -122,11 +112,9 @@ def center_score(game, player):
     float
         The heuristic value of the current game state
     """
-    if game.is_loser(player):
-        return float("-inf")
-
-    if game.is_winner(player):
-        return float("inf")
+    utility, _, _ = game.evaluate_state(player)
+    if utility:
+        return utility
 
     w, h = game.width / 2., game.height / 2.
     y, x = game.get_player_location(player)
@@ -134,7 +122,18 @@ def center_score(game, player):
 
 
 class RandomPlayer():
-    """Player that chooses a move randomly."""
+    """Player that chooses a move randomly.
+
+    Parameters
+    ----------
+    rng : `random.Random` (optional)
+        The random number generator used to choose the moves. By default the
+        player draws from the generator of the board it is given, so games on
+        a board with a seeded generator are reproducible.
+    """
+
+    def __init__(self, rng=None):
+        self.rng = rng
 
     def get_move(self, game, time_left):
         """Randomly select a move from the available legal moves.
@@ -159,7 +158,8 @@ class RandomPlayer():
         legal_moves = game.get_legal_moves()
         if not legal_moves:
             return (-1, -1)
-        return legal_moves[randint(0, len(legal_moves) - 1)]
+        rng = self.rng if self.rng is not None else game.rng
+        return legal_moves[rng.randint(0, len(legal_moves) - 1)]
 
 
 class GreedyPlayer():
@@ -0,0 +1,145 @@
+"""This file contains an opt-in instrumentation object that records what the
+search agents in game_agent.py do inside every move.
+
+Attach a `SearchStats` to a player to enable it:
+
+    player = AlphaBetaPlayer(score_fn=improved_score)
+    player.stats = SearchStats()
+
+Every call to get_move() then appends one record with the nodes visited, the
+depth of the last completed iteration, the cutoffs, whether the search was
+interrupted by SearchTimeout, the wall time spent in the heuristic and in
+move generation, and how much of the turn was left when the move was
+returned. Records are grouped into games and can be exported as JSON lines
+to track nodes/sec over time.
+
+Players without stats (the default) only pay for one attribute test per
+move and one per node generated.
+"""
+import json
+import timeit
+
+
+class SearchStats(object):
+    """Per-move and per-game search counters of one player.
+
+    Parameters
+    ----------
+    name : str (optional)
+        A label copied into every record, e.g., the agent name used in the
+        tournament.
+    """
+
+    def __init__(self, name=None):
+        self.name = name
+        self.records = []
+        self.game = 0
+        self._last_move_count = None
+        self._start = 0.
+        self.score_calls = 0
+        self.score_time = 0.
+        self.movegen_calls = 0
+        self.movegen_time = 0.
+
+    def new_game(self):
+        """Start a new game; the next records are grouped under it. Games are
+        also detected automatically when the move count of the board goes
+        down between two moves.
+        """
+        self.game += 1
+        self._last_move_count = None
+
+    def begin_move(self, game):
+        """Reset the per-move counters at the start of get_move(). """
+        if self._last_move_count is not None and game.move_count <= self._last_move_count:
+            self.new_game()
+        self._last_move_count = game.move_count
+        self.score_calls = self.movegen_calls = 0
+        self.score_time = self.movegen_time = 0.
+        self._start = timeit.default_timer()
+
+    def end_move(self, player, game, move, source="search", timed_out=False):
+        """Record the move returned by `player` at the end of get_move(). """
+        elapsed = timeit.default_timer() - self._start
+        search_stats = getattr(player, "search_stats", {})
+        record = {
+            "name": self.name,
+            "game": self.game,
+            "move_count": game.move_count,
+            "move": list(move) if move is not None else None,
+            "source": source,
+            "nodes": player.nodes,
+            "depth": search_stats.get("depth", 0),
+            "cutoffs": player.cutoffs,
+            "ebf": search_stats.get("ebf", 0.),
+            "timed_out": timed_out,
+            "elapsed_ms": 1000 * elapsed,
+            "time_left_ms": player.time_left() if player.time_left else None,
+            "threshold_ms": player.TIMER_THRESHOLD,
+            "score_calls": self.score_calls,
+            "score_ms": 1000 * self.score_time,
+            "movegen_calls": self.movegen_calls,
+            "movegen_ms": 1000 * self.movegen_time,
+            "nodes_per_sec": player.nodes / elapsed if elapsed > 0 else 0.,
+        }
+        self.records.append(record)
+        return record
+
+    def timed_score(self, score_fn):
+        """Return a wrapper of `score_fn` that counts its calls and time. """
+        def score(game, player):
+            start = timeit.default_timer()
+            try:
+                return score_fn(game, player)
+            finally:
+                self.score_calls += 1
+                self.score_time += timeit.default_timer() - start
+        return score
+
+    def legal_moves(self, game):
+        """Return `game.get_legal_moves()`, counting the call and its time. """
+        start = timeit.default_timer()
+        moves = game.get_legal_moves()
+        self.movegen_calls += 1
+        self.movegen_time += timeit.default_timer() - start
+        return moves
+
+    def game_summaries(self):
+        """Return one dict per game with the totals and averages of its moves.
+        """
+        games = {}
+        for record in self.records:
+            games.setdefault(record["game"], []).append(record)
+
+        summaries = []
+        for game, records in sorted(games.items()):
+            searched = [r for r in records if r["source"] == "search"]
+            nodes = sum(r["nodes"] for r in records)
+            elapsed = sum(r["elapsed_ms"] for r in records) / 1000
+            summaries.append({
+                "name": self.name,
+                "game": game,
+                "moves": len(records),
+                "nodes": nodes,
+                "cutoffs": sum(r["cutoffs"] for r in records),
+                "timeouts": sum(r["timed_out"] for r in records),
+                "mean_depth": (sum(r["depth"] for r in searched) / len(searched)
+                               if searched else 0.),
+                "max_depth": max([r["depth"] for r in searched] or [0]),
+                "score_ms": sum(r["score_ms"] for r in records),
+                "movegen_ms": sum(r["movegen_ms"] for r in records),
+                "nodes_per_sec": nodes / elapsed if elapsed > 0 else 0.,
+            })
+        return summaries
+
+    def write_json_lines(self, path, games=False):
+        """Append the move records (or the game summaries, if `games` is
+        True) to the file at `path`, one JSON object per line.
+        """
+        with open(path, "a") as f:
+            for record in (self.game_summaries() if games else self.records):
+                f.write(json.dumps(record) + "\n")
+
+    def clear(self):
+        """Forget every record. """
+        self.records = []
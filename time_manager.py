@@ -0,0 +1,105 @@
+"""This file contains the time manager used by the search agents in
+game_agent.py to decide when to stop searching.
+
+Without a time manager, the agents call `time_left()` at every node and stop
+when it drops under their `TIMER_THRESHOLD`. `TimeManager` replaces that in
+two ways:
+
+  1. it polls the clock only every N nodes, where N is recalibrated at every
+     poll from the measured nodes per millisecond so that the clock is read
+     about every `check_ms` milliseconds (and more often as the deadline
+     approaches),
+  2. after each completed iteration of iterative deepening, it predicts the
+     cost of the next iteration from the growth of the node counts between
+     the last two iterations, so that the agent returns at once instead of
+     starting a depth it cannot finish.
+"""
+
+DEFAULT_CHECK_MS = 1.
+MAX_INTERVAL = 4096
+
+
+class TimeManager(object):
+    """Node-count based clock polling and iteration cost prediction.
+
+    Parameters
+    ----------
+    check_ms : float (optional)
+        The target number of milliseconds between two reads of the clock.
+        It should be well below the `TIMER_THRESHOLD` of the player.
+
+    max_interval : int (optional)
+        The largest number of nodes searched between two reads of the clock.
+    """
+
+    def __init__(self, check_ms=DEFAULT_CHECK_MS, max_interval=MAX_INTERVAL):
+        self.check_ms = check_ms
+        self.max_interval = max_interval
+        self.interval = 1
+        self.checks = 0
+        self.nodes = 0
+        self.time_left = None
+        self.threshold = 0.
+        self._countdown = 1
+        self._start_left = 0.
+        self._iteration_left = 0.
+        self._iteration_nodes = 0
+        self._last_iteration_nodes = 0
+
+    def start(self, time_left, threshold):
+        """Start timing a move that must return before `time_left()` drops
+        under `threshold` milliseconds. The calibrated polling interval is
+        kept from the previous move.
+        """
+        self.time_left = time_left
+        self.threshold = threshold
+        self.checks = 0
+        self.nodes = 0
+        self._countdown = self.interval
+        self._start_left = self._iteration_left = time_left()
+        self._iteration_nodes = 0
+        self._last_iteration_nodes = 0
+
+    def tick(self):
+        """Count one node; return True if the search must stop. """
+        self._countdown -= 1
+        if self._countdown:
+            return False
+        return self.check()
+
+    def check(self):
+        """Read the clock, recalibrate the polling interval and return True
+        if the search must stop.
+        """
+        self.checks += 1
+        self.nodes += self.interval - self._countdown
+        left = self.time_left()
+        elapsed = self._start_left - left
+        if elapsed > 0:
+            nodes_per_ms = self.nodes / elapsed
+            margin = min(self.check_ms, (left - self.threshold) / 2)
+            self.interval = max(1, min(self.max_interval, int(nodes_per_ms * margin)))
+        self._countdown = self.interval
+        return left < self.threshold
+
+    def next_iteration(self):
+        """Mark the end of an iteration of iterative deepening and return
+        whether the next iteration is expected to finish in time.
+
+        The next iteration is predicted to take as long as the last one times
+        the ratio of the node counts of the last two iterations, i.e., the
+        branching factor observed between them.
+        """
+        self.nodes += self.interval - self._countdown
+        self._countdown = self.interval
+        left = self.time_left()
+        nodes = self.nodes - self._iteration_nodes
+        spent = self._iteration_left - left
+        previous = self._last_iteration_nodes
+        self._iteration_left, self._iteration_nodes = left, self.nodes
+        self._last_iteration_nodes = nodes
+
+        if not previous:
+            return left >= self.threshold
+        growth = max(1., nodes / previous)
+        return left - self.threshold > spent * growth
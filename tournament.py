@@ -10,18 +10,43 @@ The matches are fair because the board is initialized randomly for both
 players, and the players play each match twice -- once as the first player and
 once as the second player.  Randomizing the openings and switching the player
 order corrects for imbalances due to both starting position and initiative.
+
+Run with `--workers N` to play the matches on a pool of N processes, each
+pinned to its own CPU core so that the per-move time limit is not distorted
+by processes competing for a core.
+
+Run with `--seed S` to make the tournament reproducible: the openings and the
+random number generator of every board are drawn from S. Every game is then
+determined by its board seed and move history, which replay_game() re-runs
+and checks against the recorded trajectory. Players that stop searching on
+the clock (e.g., iterative deepening) can still play differently between
+runs.
+
+Run with `--record PATH` to append every game played, with its seed, opening,
+moves and the time and search depth of every move, to the game record file
+PATH (see game_records.py).
+
+Run with `--eval-cache N` to memoize the heuristic of every search agent in a
+cache of N scores (see eval_cache.py); the hit rates are printed at the end
+of sequential runs.
 """
+import argparse
 import itertools
+import multiprocessing
+import os
 import random
 import warnings
 
 from collections import namedtuple
 
 from isolation import Board
+from eval_cache import EvalCache
+from game_records import GameRecordWriter, MoveLog, make_record
 from sample_players import (RandomPlayer, open_move_score,
                             improved_score, center_score)
 from game_agent import (MinimaxPlayer, AlphaBetaPlayer, custom_score,
                         custom_score_2, custom_score_3)
+from mcts import MCTSPlayer
 
 NUM_MATCHES = 100  # number of matches against each opponent
 TIME_LIMIT = 150  # number of milliseconds before timeout
@@ -37,38 +62,225 @@ game_agent.py.
 Agent = namedtuple("Agent", ["player", "name"])
 
 
-def play_round(cpu_agent, test_agents, win_counts, num_matches):
+class ReplayMismatch(Exception):
+    """Raised by replay_game() when a replayed game leaves the recorded
+    trajectory.
+    """
+    pass
+
+
+def play_seeded(player_1, player_2, seed, opening=(), time_limit=TIME_LIMIT,
+                on_move=None):
+    """Play a game on a board whose random number generator is seeded with
+    `seed`, after forcing the moves of `opening`. `on_move` is passed to
+    `Board.play()`.
+
+    Returns (winner, move_history, termination) like `Board.play()`, except
+    that the move history starts with the opening moves.
+    """
+    game = Board(player_1, player_2, rng=random.Random(seed))
+    for move in opening:
+        game.apply_move(tuple(move))
+    winner, history, termination = game.play(time_limit=time_limit,
+                                             on_move=on_move)
+    return winner, [list(move) for move in opening] + history, termination
+
+
+def replay_game(player_1, player_2, seed, move_history, opening_plies=2,
+                time_limit=TIME_LIMIT):
+    """Re-run the game recorded by play_seeded() as `seed` and `move_history`
+    (whose first `opening_plies` moves were forced) and check that the
+    players make the same moves again.
+
+    Returns (winner, move_history, termination) of the replayed game; raises
+    ReplayMismatch at the first ply where the trajectories differ.
+    """
+    expected = [list(move) for move in move_history]
+    winner, history, termination = play_seeded(
+        player_1, player_2, seed, expected[:opening_plies], time_limit)
+    for ply, (recorded, replayed) in enumerate(zip(expected, history)):
+        if recorded != replayed:
+            raise ReplayMismatch("Ply {}: recorded move {}, replayed move {}".format(
+                ply, recorded, replayed))
+    if len(history) != len(expected):
+        raise ReplayMismatch("Recorded game has {} moves, replayed game has {}".format(
+            len(expected), len(history)))
+    return winner, history, termination
+
+
+def play_opening(cpu_agent, test_agents, rng=random, record=None):
+    """Play one "fair" set of games from a random opening: every test agent
+    plays the cpu agent once as first and once as second player, starting
+    from the same two random opening moves. The opening and the seed of every
+    board are drawn from `rng`.
+
+    If `record` is given, it is called with the `game_records.GameRecord` of
+    every game.
+
+    Returns a list of (winner, termination) pairs, one for each game.
+    """
+    # pick a random move and response shared by all games
+    opening = []
+    board = Board(cpu_agent.player, test_agents[0].player)
+    for _ in range(2):
+        opening.append(rng.choice(board.get_legal_moves()))
+        board.apply_move(opening[-1])
+
+    # play all games and collect the results
+    results = []
+    for agent in test_agents:
+        for agents in [(cpu_agent, agent), (agent, cpu_agent)]:
+            seed, move_log = rng.getrandbits(32), MoveLog()
+            winner, history, termination = play_seeded(
+                agents[0].player, agents[1].player, seed, opening,
+                on_move=move_log)
+            results.append((winner, termination))
+            if record is not None:
+                record(make_record(
+                    [agents[0].name, agents[1].name], seed,
+                    int(winner == agents[1].player), termination, history,
+                    len(opening), move_log, board.width, board.height))
+    return results
+
+
+def tally(results, win_counts):
+    """Add the (winner, termination) pairs of `results` to `win_counts` and
+    return the number of timeouts and forfeits among them.
+    """
+    timeout_count = 0
+    forfeit_count = 0
+    for winner, termination in results:
+        win_counts[winner] += 1
+
+        if termination == "timeout":
+            timeout_count += 1
+        elif termination == "forfeit":
+            forfeit_count += 1
+
+    return timeout_count, forfeit_count
+
+
+def play_round(cpu_agent, test_agents, win_counts, num_matches, rng=random,
+               record=None):
     """Compare the test agents to the cpu agent in "fair" matches.
 
     "Fair" matches use random starting locations and force the agents to
     play as both first and second player to control for advantages resulting
     from choosing better opening moves or having first initiative to move.
+    `record` is passed to play_opening().
     """
     timeout_count = 0
     forfeit_count = 0
     for _ in range(num_matches):
+        counts = tally(play_opening(cpu_agent, test_agents, rng, record),
+                       win_counts)
+        timeout_count += counts[0]
+        forfeit_count += counts[1]
 
-        games = sum([[Board(cpu_agent.player, agent.player),
-                      Board(agent.player, cpu_agent.player)]
-                    for agent in test_agents], [])
+    return timeout_count, forfeit_count
 
-        # initialize all games with a random move and response
-        for _ in range(2):
-            move = random.choice(games[0].get_legal_moves())
-            for game in games:
-                game.apply_move(move)
 
-        # play all games and tally the results
-        for game in games:
-            winner, _, termination = game.play(time_limit=TIME_LIMIT)
-            win_counts[winner] += 1
+# The agents of a worker process, set once by _init_worker()
+_worker_agents = None
 
-            if termination == "timeout":
-                timeout_count += 1
-            elif termination == "forfeit":
-                forfeit_count += 1
 
-    return timeout_count, forfeit_count
+def _init_worker(cpu_agents, test_agents, cores):
+    """Pin a pool worker to a core of its own and keep its copy of the agents.
+    """
+    global _worker_agents
+    _worker_agents = (cpu_agents, test_agents)
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {cores.get()})
+
+
+def _play_task(task):
+    """Play one opening in a pool worker. The winners are returned as the
+    index of the test agent, or -1 for the cpu agent, because the agent
+    objects of the worker are copies of the ones in the parent process. The
+    game records are returned with them if `record` is set in the task.
+    """
+    cpu_idx, seed, record = task
+    cpu_agents, test_agents = _worker_agents
+    random.seed(seed)
+    records = []
+    results = play_opening(cpu_agents[cpu_idx], test_agents, random.Random(seed),
+                           records.append if record else None)
+    players = [agent.player for agent in test_agents]
+    return [(players.index(winner) if winner in players else -1, termination)
+            for winner, termination in results], records
+
+
+def available_cores():
+    """Return the list of the CPU cores this process may run on. """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def play_rounds_parallel(cpu_agents, test_agents, num_matches, workers, seed,
+                         record=None):
+    """Play the rounds of every cpu agent on a pool of `workers` processes.
+
+    Yields (timeouts, forfeits, wins) for each cpu agent in order, where
+    `wins` counts the wins of every player like play_round() does. Every
+    opening is played with its own RNG seed drawn from `seed`, so a run is
+    reproducible for a given seed whatever the number of workers. If
+    `record` is given, it is called in this process with the record of every
+    game, as the results come in.
+    """
+    cores = available_cores()
+    if workers > len(cores):
+        warnings.warn("Only {} cores are available; using {} workers instead "
+                      "of {}.".format(len(cores), len(cores), workers))
+        workers = len(cores)
+
+    seeds = random.Random(seed)
+    tasks = [(cpu_idx, seeds.getrandbits(32), record is not None)
+             for cpu_idx in range(len(cpu_agents)) for _ in range(num_matches)]
+
+    core_queue = multiprocessing.Queue()
+    for core in cores[:workers]:
+        core_queue.put(core)
+
+    pool = multiprocessing.Pool(workers, _init_worker,
+                                (cpu_agents, test_agents, core_queue))
+    try:
+        results = pool.imap(_play_task, tasks)
+        for cpu_agent in cpu_agents:
+            wins = {agent.player: 0 for agent in test_agents}
+            wins[cpu_agent.player] = 0
+            timeouts = forfeits = 0
+            for _ in range(num_matches):
+                indexed, records = next(results)
+                for game_record in records:
+                    record(game_record)
+                counts = tally([(cpu_agent.player if idx < 0 else test_agents[idx].player,
+                                 termination) for idx, termination in indexed], wins)
+                timeouts += counts[0]
+                forfeits += counts[1]
+            yield timeouts, forfeits, wins
+    finally:
+        pool.terminate()
+
+
+def add_eval_caches(agents, size):
+    """Wrap the heuristic of every agent that has one in an `EvalCache` of
+    `size` scores; every agent gets a cache of its own.
+    """
+    for agent in agents:
+        if getattr(agent.player, "score", None) is not None:
+            agent.player.score = EvalCache(agent.player.score, size)
+
+
+def report_eval_caches(agents):
+    """Print the hit rate of the evaluation cache of every agent. """
+    print("\n{:^13}{:>10}{:>12}{:>12}".format("Agent", "Hit rate", "Hits", "Misses"))
+    for agent in agents:
+        cache = getattr(agent.player, "score", None)
+        if isinstance(cache, EvalCache):
+            stats = cache.stats()
+            print("{:^13}{:>9.1f}%{:>12}{:>12}".format(
+                agent.name, 100 * stats["hit_rate"], stats["hits"], stats["misses"]))
 
 
 def update(total_wins, wins):
@@ -77,8 +289,25 @@ def update(total_wins, wins):
     return total_wins
 
 
-def play_matches(cpu_agents, test_agents, num_matches):
-    """Play matches between the test agent and each cpu_agent individually. """
+def play_matches(cpu_agents, test_agents, num_matches, workers=1, seed=None,
+                 record_path=None):
+    """Play matches between the test agent and each cpu_agent individually.
+
+    With more than one worker, the matches are played on a process pool (see
+    play_rounds_parallel()). With a `seed`, the openings and the board random
+    number generators are drawn from it. With a `record_path`, every game is
+    appended to the game record file at that path as soon as it ends.
+    """
+    writer = GameRecordWriter(record_path) if record_path is not None else None
+    try:
+        _play_matches(cpu_agents, test_agents, num_matches, workers, seed,
+                      writer.write if writer is not None else None)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _play_matches(cpu_agents, test_agents, num_matches, workers, seed, record):
     total_wins = {agent.player: 0 for agent in test_agents}
     total_timeouts = 0.
     total_forfeits = 0.
@@ -87,13 +316,23 @@ def play_matches(cpu_agents, test_agents, num_matches):
     print("\n{:^9}{:^13}".format("Match #", "Opponent") + ''.join(['{:^13}'.format(x[1].name) for x in enumerate(test_agents)]))
     print("{:^9}{:^13} ".format("", "") +  ' '.join(['{:^5}| {:^5}'.format("Won", "Lost") for x in enumerate(test_agents)]))
 
-    for idx, agent in enumerate(cpu_agents):
-        wins = {key: 0 for (key, value) in test_agents}
-        wins[agent.player] = 0
+    if workers > 1:
+        rounds = play_rounds_parallel(cpu_agents, test_agents, num_matches,
+                                      workers, seed, record)
+    else:
+        rng = random if seed is None else random.Random(seed)
 
+    for idx, agent in enumerate(cpu_agents):
         print("{!s:^9}{:^13}".format(idx + 1, agent.name), end="", flush=True)
 
-        counts = play_round(agent, test_agents, wins, num_matches)
+        if workers > 1:
+            timeouts, forfeits, wins = next(rounds)
+            counts = (timeouts, forfeits)
+        else:
+            wins = {key: 0 for (key, value) in test_agents}
+            wins[agent.player] = 0
+            counts = play_round(agent, test_agents, wins, num_matches, rng,
+                                record)
         total_timeouts += counts[0]
         total_forfeits += counts[1]
         total_wins = update(total_wins, wins)
@@ -106,6 +345,9 @@ def play_matches(cpu_agents, test_agents, num_matches):
             ) for i in range(0, len(round_totals), 2)
         ]))
 
+    if workers > 1:
+        rounds.close()
+
     print("-" * 74)
     print('{:^9}{:^13}'.format("", "Win Rate:") +
         ''.join([
@@ -126,6 +368,26 @@ def play_matches(cpu_agents, test_agents, num_matches):
 
 def main():
 
+    parser = argparse.ArgumentParser(description=DESCRIPTION)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes playing games in parallel, "
+                             "each pinned to a dedicated core")
+    parser.add_argument("--matches", type=int, default=NUM_MATCHES,
+                        help="number of matches against each opponent")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed of the openings and board random number "
+                             "generators, for reproducible runs")
+    parser.add_argument("--mcts", action="store_true",
+                        help="add a Monte Carlo Tree Search agent to the test "
+                             "agents, playing with the same time limit")
+    parser.add_argument("--record", default=None, metavar="PATH",
+                        help="append every game played to the game record "
+                             "file PATH")
+    parser.add_argument("--eval-cache", type=int, default=0, metavar="N",
+                        help="memoize the heuristic of every search agent in "
+                             "a cache of N scores")
+    args = parser.parse_args()
+
     # Define two agents to compare -- these agents will play from the same
     # starting position against the same adversaries in the tournament
     test_agents = [
@@ -134,6 +396,8 @@ def main():
         Agent(AlphaBetaPlayer(score_fn=custom_score_2), "AB_Custom_2"),
         Agent(AlphaBetaPlayer(score_fn=custom_score_3), "AB_Custom_3")
     ]
+    if args.mcts:
+        test_agents.append(Agent(MCTSPlayer(), "MCTS"))
 
     # Define a collection of agents to compete against the test agents
     cpu_agents = [
@@ -146,11 +410,17 @@ def main():
         Agent(AlphaBetaPlayer(score_fn=improved_score), "AB_Improved")
     ]
 
+    if args.eval_cache:
+        add_eval_caches(test_agents + cpu_agents, args.eval_cache)
+
     print(DESCRIPTION)
     print("{:^74}".format("*************************"))
     print("{:^74}".format("Playing Matches"))
     print("{:^74}".format("*************************"))
-    play_matches(cpu_agents, test_agents, NUM_MATCHES)
+    play_matches(cpu_agents, test_agents, args.matches, args.workers, args.seed,
+                 args.record)
+    if args.eval_cache and args.workers <= 1:
+        report_eval_caches(test_agents + cpu_agents)
 
 
 if __name__ == "__main__":
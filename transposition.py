@@ -0,0 +1,180 @@
+"""This file contains a bounded transposition table for the alpha-beta search
+agents in game_agent.py.
+
+The table is a fixed-size list of slots indexed by the low bits of a position
+key (see `isolation.Board.perspective_key`), so its memory use never grows
+past the size given at construction. Each entry records the search depth, the
+type of bound, the score and the best move found for a position, and a
+replacement policy decides which entry survives when two positions map to the
+same slot.
+
+A table can be handed to a player at construction and outlives individual
+calls to `get_move()`, so later turns of a game reuse the work of earlier
+ones.
+"""
+
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+DEPTH_PREFERRED = "depth"
+ALWAYS_REPLACE = "always"
+TWO_TIER = "two-tier"
+
+POLICIES = (DEPTH_PREFERRED, ALWAYS_REPLACE, TWO_TIER)
+
+
+class TranspositionTable(object):
+    """Fixed-size hash table of search results.
+
+    Entries are tuples `(key, depth, flag, score, move, generation)` where
+    `flag` is one of EXACT, LOWER (the score is a lower bound, i.e., the
+    search failed high) or UPPER (the score is an upper bound).
+
+    Parameters
+    ----------
+    size : int (optional)
+        The maximum number of entries held by the table. It is rounded down
+        to a power of two; each entry costs roughly 150 bytes once filled.
+
+    policy : str (optional)
+        The replacement policy used when a slot is already taken:
+          - DEPTH_PREFERRED keeps the entry searched to the greater depth,
+            unless the stored entry is left over from an earlier search
+          - ALWAYS_REPLACE always keeps the newest entry
+          - TWO_TIER pairs a depth-preferred slot with an always-replace
+            slot, so a deep entry is never lost to a shallow one and the
+            newest entry is still kept
+    """
+
+    def __init__(self, size=2**16, policy=DEPTH_PREFERRED):
+        if policy not in POLICIES:
+            raise ValueError("Unknown replacement policy: {}".format(policy))
+        if size < 2:
+            raise ValueError("A transposition table needs at least 2 entries.")
+        self.size = 1 << (size.bit_length() - 1)
+        self.policy = policy
+        self._mask = (self.size >> 1 if policy == TWO_TIER else self.size) - 1
+        self._table = [None] * self.size
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.collisions = 0
+        self.stores = 0
+
+    def new_search(self):
+        """Mark the start of a new search so that entries left over from
+        earlier ones are preferred for replacement.
+        """
+        self.generation += 1
+
+    def clear(self):
+        """Remove every entry and reset the counters. """
+        self._table = [None] * self.size
+        self.generation = self.hits = self.misses = 0
+        self.collisions = self.stores = 0
+
+    def probe(self, key):
+        """Return the entry stored for `key`, or None on a miss. A miss on a
+        slot holding a different position also counts as a collision.
+        """
+        table = self._table
+        if self.policy == TWO_TIER:
+            idx = (key & self._mask) << 1
+            entry = table[idx]
+            if entry is None or entry[0] != key:
+                other = table[idx + 1]
+                if other is not None and (entry is None or other[0] == key):
+                    entry = other
+        else:
+            entry = table[key & self._mask]
+
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] != key:
+            self.misses += 1
+            self.collisions += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def store(self, key, depth, flag, score, move):
+        """Record the result of searching the position `key` to `depth`,
+        subject to the replacement policy.
+        """
+        table = self._table
+        entry = (key, depth, flag, score, move, self.generation)
+        self.stores += 1
+
+        if self.policy == ALWAYS_REPLACE:
+            table[key & self._mask] = entry
+            return
+
+        if self.policy == DEPTH_PREFERRED:
+            idx = key & self._mask
+            if self._replaces(table[idx], key, depth):
+                table[idx] = entry
+            return
+
+        idx = (key & self._mask) << 1
+        deep = table[idx]
+        if self._replaces(deep, key, depth):
+            # demote the displaced deep entry to the always-replace slot
+            # unless it was an older result for this same position
+            if deep is not None and deep[0] != key:
+                table[idx + 1] = deep
+            table[idx] = entry
+        else:
+            table[idx + 1] = entry
+
+    def best_move(self, key):
+        """Return the best move stored for `key` without touching the hit
+        counters, or None if the position is not in the table.
+        """
+        table = self._table
+        if self.policy == TWO_TIER:
+            idx = (key & self._mask) << 1
+            candidates = (table[idx], table[idx + 1])
+        else:
+            candidates = (table[key & self._mask],)
+        for entry in candidates:
+            if entry is not None and entry[0] == key:
+                return entry[4]
+        return None
+
+    def entries(self, generation=None):
+        """Return the list of the entries in the table, or only those stored
+        during the search `generation` if it is given.
+        """
+        return [entry for entry in self._table if entry is not None and
+                (generation is None or entry[5] == generation)]
+
+    def merge(self, entries):
+        """Store `entries` taken from another table (see entries()) into this
+        one, as results of the current search.
+        """
+        for key, depth, flag, score, move, _ in entries:
+            self.store(key, depth, flag, score, move)
+
+    def stats(self):
+        """Return a dict with the hit, miss, collision and store counters and
+        the number of slots in use.
+        """
+        probes = self.hits + self.misses
+        return {
+            "size": self.size,
+            "used": self.size - self._table.count(None),
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "hit_rate": self.hits / probes if probes else 0.,
+        }
+
+    def _replaces(self, entry, key, depth):
+        """Test whether a depth-preferred slot holding `entry` should take a
+        new result for `key` searched to `depth`.
+        """
+        return (entry is None or entry[0] == key or depth >= entry[1] or
+                entry[5] != self.generation)
@@ -0,0 +1,290 @@
+"""Tune the weights of the parameterized heuristic `game_agent.WeightedScore`
+by self-play, with Simultaneous Perturbation Stochastic Approximation (SPSA).
+
+Every iteration perturbs all the tuned weights at once by a random sign
+vector delta scaled by c_k, plays a batch of games between the two
+perturbed heuristics and moves the weights along delta by a step a_k
+proportional to the score of the batch:
+
+    theta += a_k * score(theta + c_k delta, theta - c_k delta) / (2 c_k) * delta
+
+where the score is the mean result (+1 win, -1 loss) of the first heuristic.
+The games are played in pairs from the same random two-ply opening, each
+heuristic moving first once, with fixed-depth alpha-beta agents so that the
+results do not depend on the speed of the processes; they run on a pool of
+worker processes through `Board.play`. `own_moves` is not tuned: the search
+only compares scores, so multiplying every weight by a positive constant
+plays the same moves, and its weight fixes the scale.
+
+Every `--eval-every` iterations the current weights play the default weights
+(those of custom_score); the best weights found so far are kept. The state of
+the run is written to a JSON checkpoint after every iteration, so an
+interrupted run continues with `--resume`, and the best weights are exported
+to a JSON file that `load_weights()` reads back:
+
+    python tuning.py --iterations 100 --workers 4 --output weights.json
+    player = AlphaBetaPlayer(score_fn=WeightedScore(load_weights("weights.json")))
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+
+from game_agent import AlphaBetaPlayer, DEFAULT_WEIGHTS, WeightedScore
+from isolation import Board
+from tournament import play_seeded
+
+TUNED = ("opp_moves", "move_count", "own_two_step", "opp_two_step")
+CHECKPOINT_VERSION = 1
+
+DEFAULT_ITERATIONS = 100
+DEFAULT_PAIRS = 16
+DEFAULT_DEPTH = 3
+DEFAULT_EVAL_EVERY = 10
+DEFAULT_EVAL_PAIRS = 32
+DEFAULT_CHECKPOINT = "tuning_checkpoint.json"
+DEFAULT_OUTPUT = "tuned_weights.json"
+
+# SPSA gains: a_k = A_GAIN / (k + 1 + STABILITY)**ALPHA, c_k = C_GAIN / (k + 1)**GAMMA
+A_GAIN = 1.
+C_GAIN = 0.5
+ALPHA = 0.602
+GAMMA = 0.101
+STABILITY = 10
+
+
+class FixedDepthPlayer(AlphaBetaPlayer):
+    """Alpha-beta agent searching every move to `search_depth`, whatever the
+    time left.
+    """
+
+    def choose_move(self, game):
+        if not game.get_legal_moves():
+            return (-1, -1)
+        self.nodes = self.cutoffs = 0
+        return self.alphabeta(game, self.search_depth)
+
+
+def play_pair(task):
+    """Play the two games of a pair between the heuristics with weights
+    `weights_a` and `weights_b` from a random opening drawn from `seed`, and
+    return the sum of the results of `weights_a` (+1 per win, -1 per loss).
+    """
+    weights_a, weights_b, seed, depth = task
+    rng = random.Random(seed)
+    board = Board("player_1", "player_2", rng=rng)
+    opening = []
+    for _ in range(2):
+        opening.append(rng.choice(board.get_legal_moves()))
+        board.apply_move(opening[-1])
+
+    result = 0
+    for swap in (False, True):
+        player_a = FixedDepthPlayer(search_depth=depth, score_fn=WeightedScore(weights_a))
+        player_b = FixedDepthPlayer(search_depth=depth, score_fn=WeightedScore(weights_b))
+        players = (player_b, player_a) if swap else (player_a, player_b)
+        winner, _, _ = play_seeded(players[0], players[1], rng.getrandbits(32),
+                                   opening, time_limit=float("inf"))
+        result += 1 if winner is player_a else -1
+    return result
+
+
+def match(weights_a, weights_b, pairs, depth, rng, pool=None):
+    """Return the mean result of `weights_a` against `weights_b` over `pairs`
+    pairs of games, in [-1, 1]. The games run on `pool` if it is given.
+    """
+    tasks = [(weights_a, weights_b, rng.getrandbits(32), depth) for _ in range(pairs)]
+    results = pool.map(play_pair, tasks) if pool is not None else map(play_pair, tasks)
+    return sum(results) / (2. * pairs)
+
+
+def load_weights(path):
+    """Return the weights exported to `path` by a tuning run. """
+    with open(path) as f:
+        return json.load(f)["weights"]
+
+
+def export_weights(path, weights, score=None):
+    """Write `weights` to `path`, with their score against the default
+    weights if it is known.
+    """
+    _write_json(path, {"weights": weights, "score_vs_default": score})
+
+
+def _write_json(path, data):
+    """Write `data` to `path` through a temporary file, so that an
+    interrupted write never leaves a truncated file.
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+class SPSATuner(object):
+    """The state of an SPSA tuning run.
+
+    Parameters
+    ----------
+    weights : dict (optional)
+        The initial weights; defaults to DEFAULT_WEIGHTS.
+
+    pairs : int (optional)
+        The number of pairs of games played at every iteration.
+
+    depth : int (optional)
+        The search depth of the agents.
+
+    seed : int (optional)
+        The seed of the perturbations and of the openings; the iterations
+        are reproducible from it, including after a resume.
+
+    eval_every, eval_pairs : int (optional)
+        Play `eval_pairs` pairs of games against the default weights every
+        `eval_every` iterations to track the best weights.
+    """
+
+    def __init__(self, weights=None, pairs=DEFAULT_PAIRS, depth=DEFAULT_DEPTH,
+                 seed=0, eval_every=DEFAULT_EVAL_EVERY,
+                 eval_pairs=DEFAULT_EVAL_PAIRS):
+        self.weights = dict(DEFAULT_WEIGHTS)
+        self.weights.update(weights or {})
+        self.pairs = pairs
+        self.depth = depth
+        self.seed = seed
+        self.eval_every = eval_every
+        self.eval_pairs = eval_pairs
+        self.iteration = 0
+        self.best = {"weights": dict(self.weights), "score": None, "iteration": 0}
+        self.history = []
+
+    def step(self, pool=None):
+        """Run one SPSA iteration and return the score of the perturbed
+        weights `theta + c_k delta` against `theta - c_k delta`.
+        """
+        k = self.iteration
+        rng = random.Random(self.seed * 1000003 + k)
+        a_k = A_GAIN / (k + 1 + STABILITY)**ALPHA
+        c_k = C_GAIN / (k + 1)**GAMMA
+        delta = {name: rng.choice((-1, 1)) for name in TUNED}
+
+        plus, minus = dict(self.weights), dict(self.weights)
+        for name in TUNED:
+            plus[name] += c_k * delta[name]
+            minus[name] -= c_k * delta[name]
+        score = match(plus, minus, self.pairs, self.depth, rng, pool)
+
+        for name in TUNED:
+            self.weights[name] += a_k * score / (2 * c_k) * delta[name]
+        self.iteration += 1
+        self.history.append({"iteration": self.iteration, "score": score,
+                             "weights": dict(self.weights)})
+
+        if self.eval_every and self.iteration % self.eval_every == 0:
+            self.evaluate(pool)
+        return score
+
+    def evaluate(self, pool=None):
+        """Play the current weights against the default weights and keep
+        them as the best weights if they score better than the best so far.
+        Returns their score.
+        """
+        rng = random.Random(self.seed * 1000003 - self.iteration)
+        score = match(self.weights, DEFAULT_WEIGHTS, self.eval_pairs, self.depth,
+                      rng, pool)
+        self.history[-1]["score_vs_default"] = score
+        if self.best["score"] is None or score > self.best["score"]:
+            self.best = {"weights": dict(self.weights), "score": score,
+                         "iteration": self.iteration}
+        return score
+
+    def save(self, path):
+        """Write the state of the run to the checkpoint file at `path`. """
+        _write_json(path, {
+            "version": CHECKPOINT_VERSION,
+            "config": {"pairs": self.pairs, "depth": self.depth, "seed": self.seed,
+                       "eval_every": self.eval_every, "eval_pairs": self.eval_pairs},
+            "iteration": self.iteration,
+            "weights": self.weights,
+            "best": self.best,
+            "history": self.history,
+        })
+
+    @classmethod
+    def load(cls, path):
+        """Return the tuner saved in the checkpoint file at `path`. """
+        with open(path) as f:
+            state = json.load(f)
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError("{} is not a tuning checkpoint".format(path))
+        tuner = cls(state["weights"], **state["config"])
+        tuner.iteration = state["iteration"]
+        tuner.best = state["best"]
+        tuner.history = state["history"]
+        return tuner
+
+
+def tune(tuner, iterations, workers=1, checkpoint=None, output=None, log=print):
+    """Run `tuner` until it has completed `iterations` iterations, saving it
+    to `checkpoint` after each of them, then export its best weights to
+    `output`. Returns the best weights.
+    """
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        while tuner.iteration < iterations:
+            score = tuner.step(pool)
+            if checkpoint is not None:
+                tuner.save(checkpoint)
+            if log is not None:
+                log("iteration {:>4}  score {:+.3f}  {}".format(
+                    tuner.iteration, score,
+                    "  ".join("{}={:+.3f}".format(name, tuner.weights[name])
+                              for name in TUNED)))
+        if tuner.best["iteration"] != tuner.iteration:
+            tuner.evaluate(pool)
+            if checkpoint is not None:
+                tuner.save(checkpoint)
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+    if output is not None:
+        export_weights(output, tuner.best["weights"], tuner.best["score"])
+    return tuner.best["weights"]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Tune the weights of WeightedScore with SPSA self-play.")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS)
+    parser.add_argument("--pairs", type=int, default=DEFAULT_PAIRS,
+                        help="pairs of games played at every iteration")
+    parser.add_argument("--depth", type=int, default=DEFAULT_DEPTH,
+                        help="search depth of the agents")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of processes playing games in parallel")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--eval-every", type=int, default=DEFAULT_EVAL_EVERY,
+                        help="iterations between two evaluations against the "
+                             "default weights (0 to only evaluate at the end)")
+    parser.add_argument("--eval-pairs", type=int, default=DEFAULT_EVAL_PAIRS)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the run saved in the checkpoint")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT,
+                        help="file the best weights are exported to")
+    args = parser.parse_args()
+
+    if args.resume:
+        tuner = SPSATuner.load(args.checkpoint)
+    else:
+        tuner = SPSATuner(pairs=args.pairs, depth=args.depth, seed=args.seed,
+                          eval_every=args.eval_every, eval_pairs=args.eval_pairs)
+    weights = tune(tuner, args.iterations, args.workers, args.checkpoint, args.output)
+    print("Best weights (score {} against the defaults): {}".format(
+        tuner.best["score"], weights))
+
+
+if __name__ == "__main__":
+    main()